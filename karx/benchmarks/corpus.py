@@ -0,0 +1,89 @@
+import random
+import logging
+from pathlib import Path
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+# Number of top-level functions and classes generated per module size
+MODULE_SIZES: Dict[str, Dict[str, int]] = {
+    "small": {"functions": 3, "classes": 1, "methods": 2},
+    "medium": {"functions": 20, "classes": 5, "methods": 5},
+    "large": {"functions": 120, "classes": 20, "methods": 8},
+    "huge": {"functions": 800, "classes": 80, "methods": 12}
+}
+
+_STDLIB_IMPORTS = ["os", "sys", "json", "logging", "re", "itertools", "functools", "collections"]
+
+def _generate_function(rng: random.Random, name: str, indent: str = "") -> List[str]:
+    """Generate the source lines of a small synthetic function"""
+    args = [f"arg{i}" for i in range(rng.randint(0, 3))]
+    lines = [f"{indent}def {name}({', '.join(['self'] + args if indent else args)}):"]
+    lines.append(f'{indent}    """Synthetic function {name}"""')
+    lines.append(f"{indent}    total = {rng.randint(0, 100)}")
+    for arg in args:
+        lines.append(f"{indent}    total += len(str({arg}))")
+    lines.append(f"{indent}    for i in range({rng.randint(2, 10)}):")
+    lines.append(f"{indent}        total = (total * 31 + i) % 1000003")
+    lines.append(f"{indent}    return total")
+    lines.append("")
+    return lines
+
+def generate_module(rng: random.Random, index: int, num_files: int, size: str) -> str:
+    """Generate the source of one synthetic module"""
+    spec = MODULE_SIZES[size]
+    lines = [f'"""Synthetic benchmark module {index}"""', ""]
+
+    for module in rng.sample(_STDLIB_IMPORTS, 3):
+        lines.append(f"import {module}")
+    # Cross-module imports give the linker something to resolve
+    if num_files > 1:
+        for _ in range(2):
+            other = rng.randrange(num_files)
+            lines.append(f"from pkg{other % 10}.module_{other} import func_{other}_0")
+    lines.append("")
+
+    lines.append(f"CONSTANT_{index} = {rng.randint(0, 1000)}")
+    lines.append(f"NAMES_{index} = {[f'name{i}' for i in range(3)]!r}")
+    lines.append("")
+
+    for f in range(spec["functions"]):
+        lines.extend(_generate_function(rng, f"func_{index}_{f}"))
+
+    for c in range(spec["classes"]):
+        lines.append(f"class Class_{index}_{c}:")
+        lines.append(f'    """Synthetic class {c}"""')
+        lines.append("")
+        for m in range(spec["methods"]):
+            lines.extend(_generate_function(rng, f"method_{m}", indent="    "))
+
+    return "\n".join(lines) + "\n"
+
+def generate_corpus(root: Path, num_files: int, size: str = "small", seed: int = 0) -> List[Path]:
+    """
+    Generate a reproducible synthetic Python corpus
+
+    Args:
+        root: Directory to write the corpus to
+        num_files: Number of modules to generate
+        size: Module size, one of MODULE_SIZES
+        seed: Random seed, the same seed always produces the same corpus
+
+    Returns:
+        List of paths of the generated modules
+    """
+    if size not in MODULE_SIZES:
+        raise ValueError(f"Unknown module size: {size}")
+
+    rng = random.Random(seed)
+    files = []
+    for index in range(num_files):
+        # Spread modules over packages so directories stay a realistic size
+        package = root / f"pkg{index % 10}"
+        package.mkdir(parents=True, exist_ok=True)
+        file_path = package / f"module_{index}.py"
+        file_path.write_text(generate_module(rng, index, num_files, size), encoding='utf-8')
+        files.append(file_path)
+
+    logger.info(f"Generated {num_files} {size} modules in {root}")
+    return files
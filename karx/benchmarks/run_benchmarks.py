@@ -0,0 +1,294 @@
+#!/usr/bin/env python3
+
+import sys
+import json
+import time
+import logging
+import argparse
+import statistics
+import platform
+import tempfile
+import multiprocessing
+from queue import Empty
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from datetime import datetime
+
+# Allow running as a script from any directory
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from benchmarks.corpus import MODULE_SIZES, generate_corpus
+
+logger = logging.getLogger(__name__)
+
+# Metrics compared against the baseline, and whether higher values are better
+COMPARED_METRICS = {
+    "throughput_per_sec": True,
+    "p95_ms": False,
+    "peak_rss_mb": False
+}
+
+def _peak_rss_mb() -> float:
+    """Get the peak resident set size of this process in megabytes"""
+    try:
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in kilobytes on Linux and bytes on macOS
+        return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+    except ImportError:
+        import psutil
+        info = psutil.Process().memory_info()
+        return getattr(info, "peak_wset", info.rss) / (1024 * 1024)
+
+def _percentile(sorted_values: List[float], percent: float) -> float:
+    """Get a percentile from sorted values using linear interpolation"""
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * percent / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def _add_source(manager: Any, reader: Any, path: Path) -> bool:
+    """Index a file from its raw bytes, the way the bulk scan does"""
+    source = reader.open(path)
+    if source is None:
+        return False
+    with source:
+        return manager.add_file(path, source, save=False)
+
+def _setup_memory(workdir: Path, files: List[Path]) -> Callable[..., Any]:
+    from memory.memory_manager import MemoryManager
+    from utils.source_reader import SourceReader
+    manager = MemoryManager(workdir / "memory" / "code_map.json")
+    reader = SourceReader()
+    # Saving is measured by memory.save_memory, saving per file would make this quadratic
+    return lambda path: _add_source(manager, reader, path)
+
+def _setup_memory_save(workdir: Path, files: List[Path]) -> Callable[..., Any]:
+    from memory.memory_manager import MemoryManager
+    from utils.source_reader import SourceReader
+    manager = MemoryManager(workdir / "memory" / "code_map.json")
+    reader = SourceReader()
+    for path in files:
+        _add_source(manager, reader, path)
+    return manager.save_memory
+
+def _setup_explainer(workdir: Path, files: List[Path]) -> Callable[..., Any]:
+    from core.explainer import Explainer
+    return Explainer().explain
+
+def _setup_linker(workdir: Path, files: List[Path]) -> Callable[..., Any]:
+    from core.linker import Linker
+    return Linker().fix_imports
+
+def _setup_smartfix(workdir: Path, files: List[Path]) -> Callable[..., Any]:
+    from core.smartfix import SmartFix
+    return SmartFix().fix
+
+def _setup_code_writer(workdir: Path, files: List[Path]) -> Callable[..., Any]:
+    from core.code_writer import CodeWriter
+    writer = CodeWriter()
+    output_dir = workdir / "generated"
+    return lambda path: writer.generate(path.read_text(encoding='utf-8'), output_dir)
+
+# Benchmark name -> (setup, per_file); per-file operations are called with each
+# corpus file, the others once per pass without arguments
+BENCHMARKS: Dict[str, Tuple[Callable[[Path, List[Path]], Callable[..., Any]], bool]] = {
+    "memory.add_file": (_setup_memory, True),
+    "memory.save_memory": (_setup_memory_save, False),
+    "explainer.explain": (_setup_explainer, True),
+    "linker.fix_imports": (_setup_linker, True),
+    "smartfix.fix": (_setup_smartfix, True),
+    "code_writer.generate": (_setup_code_writer, True)
+}
+
+def _run_pass(operation: Callable[..., Any], files: List[Path], per_file: bool) -> Tuple[float, List[float]]:
+    """Run one pass, returning its duration and the latency of each call"""
+    latencies = []
+    started = time.perf_counter()
+    for path in (files if per_file else [None]):
+        call_start = time.perf_counter()
+        if per_file:
+            operation(path)
+        else:
+            operation()
+        latencies.append(time.perf_counter() - call_start)
+    return time.perf_counter() - started, latencies
+
+def run_benchmark(name: str, files: List[Path], workdir: Path, repeat: int = 5, warmup: int = 1,
+                  min_time: float = 0.5) -> Dict[str, float]:
+    """
+    Run one benchmark over the corpus for several timed passes
+
+    Args:
+        name: Name of the benchmark in BENCHMARKS
+        files: Corpus files to feed to the operation
+        workdir: Scratch directory for state the operation writes
+        repeat: Minimum number of timed passes over the corpus
+        warmup: Number of untimed passes run first
+        min_time: Keep running timed passes until they took this many seconds in total
+
+    Returns:
+        Dict of the median throughput over the timed passes, latency
+        percentiles over all their calls, the fastest pass and peak RSS
+    """
+    setup, per_file = BENCHMARKS[name]
+    operation = setup(workdir, files)
+    for _ in range(warmup):
+        _run_pass(operation, files, per_file)
+    passes = []
+    timed_total = 0.0
+    # Short passes are noisy, so small corpora get more samples for the medians
+    while len(passes) < max(1, repeat) or timed_total < min_time:
+        passes.append(_run_pass(operation, files, per_file))
+        timed_total += passes[-1][0]
+
+    durations = [elapsed for elapsed, _ in passes]
+    calls = len(passes[0][1])
+    # Percentiles over the calls of all timed passes, a single short pass has too few samples
+    latencies = sorted(latency for _, pass_latencies in passes for latency in pass_latencies)
+    return {
+        "calls": calls,
+        "passes": len(passes),
+        "warmup": warmup,
+        "total_seconds": sum(durations),
+        "median_pass_seconds": statistics.median(durations),
+        "best_pass_seconds": min(durations),
+        "throughput_per_sec": statistics.median(calls / elapsed for elapsed in durations if elapsed) if any(durations) else 0.0,
+        "p50_ms": _percentile(latencies, 50) * 1000,
+        "p95_ms": _percentile(latencies, 95) * 1000,
+        "p99_ms": _percentile(latencies, 99) * 1000,
+        "max_ms": latencies[-1] * 1000,
+        "peak_rss_mb": _peak_rss_mb()
+    }
+
+def _run_in_child(name: str, files: List[Path], workdir: Path, repeat: int, warmup: int, min_time: float,
+                  queue) -> None:
+    """Child process entry point so each benchmark gets its own peak RSS"""
+    logging.disable(logging.CRITICAL)
+    try:
+        queue.put((name, run_benchmark(name, files, workdir, repeat, warmup, min_time), None))
+    except Exception as e:
+        queue.put((name, None, str(e)))
+
+def _run_isolated(name: str, files: List[Path], workdir: Path, repeat: int, warmup: int,
+                  min_time: float) -> Dict[str, float]:
+    """Run a benchmark in a fresh process"""
+    context = multiprocessing.get_context("spawn")
+    queue = context.Queue()
+    process = context.Process(target=_run_in_child, args=(name, files, workdir, repeat, warmup, min_time, queue))
+    process.start()
+    while True:
+        try:
+            _, result, error = queue.get(timeout=1.0)
+            break
+        except Empty:
+            if process.is_alive():
+                continue
+            # A result put just before exiting may still be in flight
+            try:
+                _, result, error = queue.get(timeout=1.0)
+                break
+            except Empty:
+                process.join()
+                raise RuntimeError(f"Benchmark {name} exited with code {process.exitcode} without a result") from None
+    process.join()
+    if error:
+        raise RuntimeError(f"Benchmark {name} failed: {error}")
+    return result
+
+def compare_to_baseline(results: Dict[str, Any], baseline: Dict[str, Any],
+                        threshold: float) -> List[Tuple[str, str, float, float]]:
+    """
+    Compare results against a baseline run
+
+    Args:
+        results: Results produced by this run
+        baseline: Results loaded from the baseline file
+        threshold: Allowed relative slowdown, e.g. 0.1 for 10%
+
+    Returns:
+        List of (benchmark, metric, baseline value, current value) regressions
+    """
+    if results.get("corpus") != baseline.get("corpus"):
+        logger.warning("Baseline was recorded with a different corpus, comparison may be meaningless")
+
+    regressions = []
+    for name, current in results["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if not previous:
+            continue
+        for metric, higher_is_better in COMPARED_METRICS.items():
+            old, new = previous.get(metric), current.get(metric)
+            if not old or new is None:
+                continue
+            change = (old - new) / old if higher_is_better else (new - old) / old
+            if change > threshold:
+                regressions.append((name, metric, old, new))
+    return regressions
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description='KARX benchmark suite')
+    parser.add_argument('--files', type=int, default=100, help='Number of modules in the synthetic corpus')
+    parser.add_argument('--module-size', choices=sorted(MODULE_SIZES), default='small', help='Size of each module')
+    parser.add_argument('--seed', type=int, default=0, help='Seed for corpus generation')
+    parser.add_argument('--repeat', type=int, default=5, help='Timed passes over the corpus; medians are reported (default: 5)')
+    parser.add_argument('--warmup', type=int, default=1, help='Untimed passes before timing (default: 1)')
+    parser.add_argument('--min-time', type=float, default=0.5,
+                        help='Minimum timed seconds per benchmark, adding passes as needed (default: 0.5)')
+    parser.add_argument('--only', nargs='+', choices=sorted(BENCHMARKS), help='Benchmarks to run')
+    parser.add_argument('--output', type=Path, default=Path('benchmark_results.json'), help='Results file')
+    parser.add_argument('--baseline', type=Path, help='Baseline results file to compare against')
+    parser.add_argument('--threshold', type=float, default=0.10, help='Allowed relative regression (default: 0.10)')
+    parser.add_argument('--no-isolate', action='store_true', help='Run benchmarks in this process')
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+
+    with tempfile.TemporaryDirectory(prefix="karx_bench_") as tmp:
+        tmp_path = Path(tmp)
+        files = generate_corpus(tmp_path / "corpus", args.files, args.module_size, args.seed)
+
+        results = {}
+        for name in args.only or list(BENCHMARKS):
+            workdir = tmp_path / "work" / name
+            workdir.mkdir(parents=True)
+            if args.no_isolate:
+                logging.disable(logging.CRITICAL)
+                result = run_benchmark(name, files, workdir, args.repeat, args.warmup, args.min_time)
+                logging.disable(logging.NOTSET)
+            else:
+                result = _run_isolated(name, files, workdir, args.repeat, args.warmup, args.min_time)
+            results[name] = result
+            logger.info(f"{name:24} {result['throughput_per_sec']:10.1f} ops/s  "
+                        f"p50 {result['p50_ms']:8.3f}ms  p95 {result['p95_ms']:8.3f}ms  "
+                        f"p99 {result['p99_ms']:8.3f}ms  rss {result['peak_rss_mb']:7.1f}MB")
+
+    report = {
+        "timestamp": str(datetime.now()),
+        "python": platform.python_version(),
+        "platform": f"{platform.system()} {platform.release()}",
+        "corpus": {"files": args.files, "module_size": args.module_size, "seed": args.seed, "repeat": args.repeat, "warmup": args.warmup, "min_time": args.min_time},
+        "results": results
+    }
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(report, indent=2), encoding='utf-8')
+    logger.info(f"Results written to: {args.output}")
+
+    if args.baseline:
+        if not args.baseline.exists():
+            logger.error(f"Baseline file not found: {args.baseline}")
+            return 1
+        baseline = json.loads(args.baseline.read_text(encoding='utf-8'))
+        regressions = compare_to_baseline(report, baseline, args.threshold)
+        for name, metric, old, new in regressions:
+            logger.error(f"Regression in {name} {metric}: {old:.3f} -> {new:.3f}")
+        if regressions:
+            return 1
+        logger.info(f"No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
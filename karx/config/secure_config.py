@@ -1,24 +1,132 @@
 import os
+import copy
+import bisect
+import functools
 from pathlib import Path
-from typing import Optional
-import json
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import hmac
+import time
 import hashlib
 import logging
+import secrets
+import threading
+from contextlib import contextmanager
 from datetime import datetime
+from utils.persistence import load_data, save_data
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_CONFIG_FILE = Path("config/karx_secure.json")
+
+# Maximum number of resolved parent directories remembered by is_path_allowed
+PATH_CACHE_SIZE = 4096
+
+# Default lifetime of a session handle in seconds
+DEFAULT_SESSION_TTL = 900.0
+# Number of stored sessions above which issue_session prunes dead ones
+SESSION_PRUNE_THRESHOLD = 1024
+
+class _RateCounter:
+    """Counts events in one-second buckets over a sliding window"""
+
+    def __init__(self, window: int = 60):
+        self.window = window
+        self.total = 0
+        self._buckets: Dict[int, int] = {}
+        self._lock = threading.Lock()
+
+    def record(self) -> None:
+        second = int(time.monotonic())
+        with self._lock:
+            self.total += 1
+            self._buckets[second] = self._buckets.get(second, 0) + 1
+            if len(self._buckets) > self.window:
+                cutoff = second - self.window
+                for key in [k for k in self._buckets if k <= cutoff]:
+                    del self._buckets[key]
+
+    def per_second(self) -> float:
+        cutoff = int(time.monotonic()) - self.window
+        with self._lock:
+            recent = sum(count for second, count in self._buckets.items() if second > cutoff)
+        return recent / self.window
+
 class SecureConfig:
+    _instances: Dict[str, "SecureConfig"] = {}
+    _instances_lock = threading.Lock()
+
     def __init__(self, config_file: Optional[Path] = None):
-        self.config_file = config_file or Path("config/karx_secure.json")
+        self.config_file = config_file or DEFAULT_CONFIG_FILE
+        self._lock = threading.RLock()
+        self._file_signature: Optional[Tuple[int, int, int]] = None
+        self._batch_depth = 0
+        self._dirty = False
+        self._allowed_source: Optional[List[str]] = None
+        self._allowed_prefixes: Tuple[str, ...] = ()
+        self._resolve = functools.lru_cache(maxsize=PATH_CACHE_SIZE)(os.path.realpath)
+        # Tokens that passed verification, mapped to the stored hash they matched
+        self._verified_tokens: Dict[str, str] = {}
+        # Session handles mapped to (expiry, stored hash they were issued for)
+        self._sessions: Dict[str, Tuple[float, str]] = {}
+        self._session_prune_at = SESSION_PRUNE_THRESHOLD
+        self._verifications = _RateCounter()
+        self._cache_hits = 0
         self.config = self._load_config()
+    
+    @classmethod
+    def shared(cls, config_file: Optional[Path] = None) -> "SecureConfig":
+        """
+        Get the process-wide configuration for a config file
+        
+        The file is only parsed again when its inode, mtime or size changed
+        since it was last read or written by this process.
+        """
+        path = config_file or DEFAULT_CONFIG_FILE
+        key = os.path.abspath(path)
+        with cls._instances_lock:
+            instance = cls._instances.get(key)
+            if instance is None:
+                instance = cls(path)
+                cls._instances[key] = instance
+                return instance
+        instance.reload_if_changed()
+        return instance
+    
+    @classmethod
+    def clear_shared(cls) -> None:
+        """Forget all shared instances so the next access reads from disk"""
+        with cls._instances_lock:
+            cls._instances.clear()
+    
+    def _read_signature(self) -> Optional[Tuple[int, int, int]]:
+        """Get the (inode, mtime, size) signature of the config file"""
+        try:
+            st = os.stat(self.config_file)
+            return (st.st_ino, st.st_mtime_ns, st.st_size)
+        except OSError:
+            return None
+    
+    def reload_if_changed(self) -> bool:
+        """Reload the configuration if the file changed on disk"""
+        with self._lock:
+            # Never clobber pending changes of an open batch
+            if self._batch_depth:
+                return False
+            if self._read_signature() == self._file_signature:
+                return False
+            logger.info("Configuration file changed on disk, reloading")
+            self.config = self._load_config()
+            self.clear_path_cache()
+            return True
         
     def _load_config(self) -> dict:
         """Load or create secure configuration"""
-        if not self.config_file.exists():
+        # Take the signature before reading so a concurrent write triggers a later reload
+        self._file_signature = self._read_signature()
+        if self._file_signature is None:
             return self._create_default_config()
         try:
-            return json.loads(self.config_file.read_text(encoding='utf-8'))
+            return load_data(self.config_file)
         except Exception as e:
             logger.error(f"Error loading config: {str(e)}")
             return self._create_default_config()
@@ -38,18 +146,59 @@ class SecureConfig:
         }
         return config
     
+    def _write_config(self) -> None:
+        """Write configuration to disk, raising on failure"""
+        self.config["last_modified"] = str(datetime.now())
+        # Kept indented since it is edited by hand; read/write for owner only
+        save_data(self.config_file, self.config, pretty=True, mode=0o600)
+        # Our own write must not trigger a reload
+        self._file_signature = self._read_signature()
+    
     def save_config(self) -> bool:
-        """Save configuration securely"""
+        """Save configuration securely, deferred until the end of an open batch"""
         try:
-            self.config_file.parent.mkdir(parents=True, exist_ok=True)
-            self.config["last_modified"] = str(datetime.now())
-            self.config_file.write_text(json.dumps(self.config, indent=2), encoding='utf-8')
-            os.chmod(self.config_file, 0o600)  # Read/write for owner only
+            with self._lock:
+                if self._batch_depth:
+                    self._dirty = True
+                    return True
+                self._write_config()
             return True
         except Exception as e:
             logger.error(f"Error saving config: {str(e)}")
             return False
     
+    @contextmanager
+    def batch_update(self) -> Iterator["SecureConfig"]:
+        """
+        Group several updates into a single write
+        
+        Setters and save_config() inside the block only mark the configuration
+        dirty; it is written once when the outermost block exits. If the block
+        raises, or the final write fails, the in-memory configuration is rolled
+        back and the exception propagates.
+        """
+        with self._lock:
+            if self._batch_depth == 0:
+                snapshot = copy.deepcopy(self.config)
+                self._dirty = False
+            self._batch_depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    self.config = snapshot
+                    self._dirty = False
+                raise
+            self._batch_depth -= 1
+            if self._batch_depth == 0 and self._dirty:
+                self._dirty = False
+                try:
+                    self._write_config()
+                except Exception:
+                    self.config = snapshot
+                    raise
+    
     def set_output_path(self, path: Path) -> bool:
         """Set the secure output path"""
         try:
@@ -68,21 +217,95 @@ class SecureConfig:
         try:
             hashed = hashlib.sha256(token.encode()).hexdigest()
             self.config["access_token"] = hashed
+            self._verified_tokens.clear()
             return self.save_config()
         except Exception as e:
             logger.error(f"Error setting access token: {str(e)}")
             return False
     
     def verify_access(self, token: str) -> bool:
-        """Verify access token"""
+        """
+        Verify access token
+        
+        Tokens that verified once are remembered for the process lifetime, so
+        repeated checks skip hashing. A cached token stops verifying as soon as
+        the stored token changes.
+        """
         try:
-            if not self.config["access_token"]:
+            stored = self.config["access_token"]
+            if not stored:
                 return False
+            self._verifications.record()
+            cached = self._verified_tokens.get(token)
+            if cached is not None:
+                self._cache_hits += 1
+                return hmac.compare_digest(cached, stored)
             hashed = hashlib.sha256(token.encode()).hexdigest()
-            return hashed == self.config["access_token"]
+            if not hmac.compare_digest(hashed, stored):
+                return False
+            self._verified_tokens[token] = hashed
+            return True
         except Exception:
             return False
     
+    def issue_session(self, token: str, ttl: float = DEFAULT_SESSION_TTL) -> Optional[str]:
+        """
+        Issue a short-lived, in-memory session handle for a valid token
+        
+        Args:
+            token: Access token to verify
+            ttl: Lifetime of the session in seconds
+            
+        Returns:
+            The session handle, or None if the token is invalid
+        """
+        if not self.verify_access(token):
+            return None
+        now = time.monotonic()
+        if len(self._sessions) >= self._session_prune_at:
+            self._prune_sessions(now)
+        handle = secrets.token_urlsafe(32)
+        self._sessions[handle] = (now + ttl, self.config["access_token"])
+        return handle
+    
+    def _session_alive(self, session: Tuple[float, str], now: float) -> bool:
+        expiry, token_hash = session
+        # Sessions die with their expiry or when the access token is rotated
+        return now <= expiry and hmac.compare_digest(token_hash, self.config.get("access_token") or "")
+    
+    def _prune_sessions(self, now: float) -> None:
+        """Drop expired sessions and those of a rotated token"""
+        for handle, session in list(self._sessions.items()):
+            if not self._session_alive(session, now):
+                self._sessions.pop(handle, None)
+        # Prune again once the live sessions doubled, keeping issuing amortized O(1)
+        self._session_prune_at = max(SESSION_PRUNE_THRESHOLD, 2 * len(self._sessions))
+    
+    def verify_session(self, handle: str) -> bool:
+        """Check a session handle issued by issue_session"""
+        self._verifications.record()
+        session = self._sessions.get(handle)
+        if session is None:
+            return False
+        if not self._session_alive(session, time.monotonic()):
+            self._sessions.pop(handle, None)
+            return False
+        return True
+    
+    def revoke_session(self, handle: str) -> bool:
+        """Revoke a session handle, returning True if it existed"""
+        return self._sessions.pop(handle, None) is not None
+    
+    def get_auth_metrics(self) -> Dict[str, float]:
+        """Get token and session verification metrics for this process"""
+        now = time.monotonic()
+        return {
+            "verifications_total": self._verifications.total,
+            "verifications_per_second": self._verifications.per_second(),
+            "token_cache_hits": self._cache_hits,
+            "active_sessions": sum(1 for session in list(self._sessions.values()) if self._session_alive(session, now))
+        }
+    
     def get_output_path(self) -> Optional[Path]:
         """Get the configured output path"""
         try:
@@ -91,11 +314,65 @@ class SecureConfig:
         except Exception:
             return None
     
+    def clear_path_cache(self) -> None:
+        """Forget resolved paths, e.g. after symlinks in allowed directories changed"""
+        with self._lock:
+            self._allowed_source = None
+            self._allowed_prefixes = ()
+            self._resolve.cache_clear()
+    
+    def _get_allowed_prefixes(self) -> Tuple[str, ...]:
+        """
+        Get the resolved allowed directories as sorted, separator-terminated prefixes
+        
+        Directories nested in another allowed directory are dropped, which makes
+        the closest preceding prefix in sort order the only possible match.
+        """
+        allowed_dirs = self.config["permissions"]["allowed_directories"]
+        if allowed_dirs == self._allowed_source:
+            return self._allowed_prefixes
+        with self._lock:
+            prefixes: List[str] = []
+            for resolved in sorted(os.path.join(os.path.realpath(d), "") for d in allowed_dirs):
+                if prefixes and resolved.startswith(prefixes[-1]):
+                    continue
+                prefixes.append(resolved)
+            self._allowed_prefixes = tuple(prefixes)
+            self._allowed_source = list(allowed_dirs)
+            self._resolve.cache_clear()
+            return self._allowed_prefixes
+    
     def is_path_allowed(self, path: Path) -> bool:
-        """Check if path is within allowed directories"""
+        """
+        Check if path is within allowed directories
+        
+        Candidates are fully resolved, so a symlink pointing out of an allowed
+        directory is rejected. Parent directory resolutions are cached and the
+        final component is checked with a single lstat; call clear_path_cache()
+        if symlinked directories under the allowed directories are re-pointed.
+        Paths containing '..' are resolved in full without the cache, since
+        '..' must be applied after the symlinks before it are followed.
+        """
         try:
-            abs_path = path.resolve()
-            allowed_dirs = [Path(d) for d in self.config["permissions"]["allowed_directories"]]
-            return any(abs_path.is_relative_to(d) for d in allowed_dirs)
+            prefixes = self._get_allowed_prefixes()
+            if not prefixes:
+                return False
+            # Not normalized: abspath would collapse 'link/..' before resolving 'link'
+            absolute = os.path.join(os.getcwd(), os.fspath(path))
+            if os.pardir in absolute.split(os.sep):
+                candidate = os.path.realpath(absolute)
+            else:
+                parent, name = os.path.split(absolute)
+                candidate = os.path.join(self._resolve(parent), name)
+                if os.path.islink(candidate):
+                    candidate = os.path.realpath(candidate)
+            if not candidate.endswith(os.sep):
+                candidate += os.sep
+            index = bisect.bisect_right(prefixes, candidate) - 1
+            return index >= 0 and candidate.startswith(prefixes[index])
         except Exception:
-            return False
\ No newline at end of file
+            return False
+    
+    def filter_allowed_paths(self, paths: Iterable[Path]) -> List[Path]:
+        """Return the paths that are within allowed directories"""
+        return [path for path in paths if self.is_path_allowed(path)]
\ No newline at end of file
@@ -1,6 +1,7 @@
 from pathlib import Path
 from typing import Optional
 import logging
+from utils.profiling import span, timed
 
 logger = logging.getLogger(__name__)
 
@@ -8,6 +9,7 @@ class CodeWriter:
     def __init__(self):
         self.templates = {}
         
+    @span("agent.code_writer.generate")
     def generate(self, prompt: str, output_dir: Optional[Path] = None) -> Path:
         """
         Generate code from a prompt and save it to the specified directory
@@ -21,14 +23,15 @@ class CodeWriter:
         """
         try:
             # TODO: Implement actual code generation logic
-            logger.info(f"Generating code from prompt: {prompt[:100]}...")
+            logger.info("Generating code from prompt: %.100s...", prompt)
             
             if output_dir:
                 output_dir.mkdir(parents=True, exist_ok=True)
             
             # For now, just create a placeholder file
             output_file = output_dir / "generated_code.py" if output_dir else Path("generated_code.py")
-            output_file.write_text(f"# Generated from prompt:\n# {prompt}\n\n# TODO: Implement generated code")
+            with timed("io.write"):
+                output_file.write_text(f"# Generated from prompt:\n# {prompt}\n\n# TODO: Implement generated code")
             
             return output_file
             
@@ -1,14 +1,18 @@
 from pathlib import Path
 import ast
 import logging
-from typing import List, Tuple
+from typing import Iterable, List, Optional, Tuple
+from utils.profiling import span
+from utils.source_reader import SourceReader
 
 logger = logging.getLogger(__name__)
 
 class Explainer:
-    def __init__(self):
+    def __init__(self, reader: Optional[SourceReader] = None):
         self.explanations_cache = {}
+        self.reader = reader or SourceReader()
         
+    @span("agent.explainer.explain")
     def explain(self, file_path: Path) -> List[Tuple[int, str, str]]:
         """
         Provide line-by-line explanation of the code
@@ -20,16 +24,18 @@ class Explainer:
             List of tuples containing (line_number, code, explanation)
         """
         try:
-            logger.info(f"Generating explanation for: {file_path}")
-            content = file_path.read_text()
+            logger.info("Generating explanation for: %s", file_path)
+            source = self.reader.open(file_path)
+            if source is None:
+                return []
             
             # Parse the file
-            tree = ast.parse(content)
-            explanations = []
-            
-            # Get all lines
-            lines = content.splitlines()
+            with source:
+                tree = source.parse()
+                # Get all lines
+                lines = source.text.splitlines()
             
+            explanations = []
             for i, line in enumerate(lines, start=1):
                 line = line.strip()
                 if not line or line.startswith('#'):
@@ -44,6 +50,11 @@ class Explainer:
             logger.error(f"Error explaining code: {str(e)}")
             return []
     
+    def invalidate(self, paths: Iterable[Path]) -> None:
+        """Drop cached explanations for the given files"""
+        for path in paths:
+            self.explanations_cache.pop(str(path), None)
+    
     def _explain_line(self, line: str, ast_tree: ast.AST) -> str:
         """Generate explanation for a single line of code"""
         # TODO: Implement smart code explanation logic
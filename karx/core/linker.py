@@ -1,15 +1,23 @@
 from pathlib import Path
 import ast
 import logging
-from typing import List, Dict
+import threading
+from typing import Iterable, List, Dict, Optional
+from utils.helpers import synchronized, walk_files
+from utils.profiling import span, timed
+from utils.source_reader import SourceReader
 
 logger = logging.getLogger(__name__)
 
 class Linker:
-    def __init__(self):
+    def __init__(self, reader: Optional[SourceReader] = None):
         self.import_cache = {}
         self.module_map = {}
+        self.reader = reader or SourceReader()
+        # Held while the module map or import cache change
+        self.lock = threading.RLock()
         
+    @span("agent.linker.fix_imports")
     def fix_imports(self, file_path: Path) -> bool:
         """
         Fix import paths in the given file
@@ -21,12 +29,16 @@ class Linker:
             bool: True if fixes were applied, False otherwise
         """
         try:
-            logger.info(f"Fixing imports in: {file_path}")
-            content = file_path.read_text()
+            logger.info("Fixing imports in: %s", file_path)
+            source = self.reader.open(file_path)
+            if source is None:
+                return False
             
             # Parse the file
-            tree = ast.parse(content)
-            imports = self._collect_imports(tree)
+            with source:
+                tree = source.parse()
+                content = source.text
+            imports = self._collect_imports(tree, content)
             
             if not imports:
                 logger.info("No imports found to fix")
@@ -42,7 +54,8 @@ class Linker:
                     fixed = True
             
             if fixed:
-                file_path.write_text(new_content)
+                with timed("io.write"):
+                    file_path.write_bytes(source.encode(new_content))
                 logger.info("Fixed imports successfully")
             
             return fixed
@@ -51,15 +64,15 @@ class Linker:
             logger.error(f"Error fixing imports: {str(e)}")
             return False
     
-    def _collect_imports(self, tree: ast.AST) -> List[str]:
+    def _collect_imports(self, tree: ast.AST, content: str) -> List[str]:
         """Collect all import statements from the AST"""
         imports = []
         for node in ast.walk(tree):
             if isinstance(node, (ast.Import, ast.ImportFrom)):
-                # Get the original import line
-                start = node.lineno - 1
-                end = node.end_lineno if hasattr(node, 'end_lineno') else start + 1
-                imports.append(ast.get_source_segment(tree, node))
+                # Get the original import statement
+                segment = ast.get_source_segment(content, node)
+                if segment:
+                    imports.append(segment)
         return imports
     
     def _fix_import(self, import_stmt: str, file_path: Path) -> str:
@@ -70,5 +83,44 @@ class Linker:
     
     def _map_modules(self, root_dir: Path) -> Dict[str, Path]:
         """Create a map of module names to their file paths"""
-        # TODO: Implement module mapping logic
-        return {} 
\ No newline at end of file
+        modules = {}
+        for record in walk_files(root_dir, include=["*.py"]):
+            module = self._module_name(root_dir, Path(record.path))
+            if module:
+                modules[module] = Path(record.path)
+        return modules
+    
+    def _module_name(self, root_dir: Path, file_path: Path) -> str:
+        """Get the dotted module name of a file relative to the project root"""
+        try:
+            parts = list(file_path.relative_to(root_dir).with_suffix("").parts)
+        except ValueError:
+            return ""
+        if parts and parts[-1] == "__init__":
+            parts.pop()
+        return ".".join(parts)
+    
+    @synchronized
+    def build_module_map(self, root_dir: Path) -> Dict[str, Path]:
+        """Rebuild the module map of a project from scratch"""
+        self.module_map = self._map_modules(root_dir)
+        return self.module_map
+    
+    @synchronized
+    def update_module_map(self, root_dir: Path, changed: Iterable[Path], deleted: Iterable[Path]) -> None:
+        """Apply created, modified and deleted files to the module map"""
+        for path in deleted:
+            module = self._module_name(root_dir, path)
+            if self.module_map.get(module) == path:
+                del self.module_map[module]
+        for path in changed:
+            if path.suffix == ".py":
+                module = self._module_name(root_dir, path)
+                if module:
+                    self.module_map[module] = path
+    
+    @synchronized
+    def invalidate(self, paths: Iterable[Path]) -> None:
+        """Drop cached import information for the given files"""
+        for path in paths:
+            self.import_cache.pop(str(path), None) 
\ No newline at end of file
@@ -1,17 +1,21 @@
 from pathlib import Path
-import ast
 import logging
+from typing import Optional
+from utils.profiling import span
+from utils.source_reader import SourceReader
 
 logger = logging.getLogger(__name__)
 
 class SmartFix:
-    def __init__(self):
+    def __init__(self, reader: Optional[SourceReader] = None):
+        self.reader = reader or SourceReader()
         self.common_fixes = {
             'unused_import': self._fix_unused_imports,
             'undefined_name': self._fix_undefined_names,
             'syntax_error': self._fix_syntax_errors
         }
     
+    @span("agent.smartfix.fix")
     def fix(self, file_path: Path) -> bool:
         """
         Analyze and fix common issues in the given file
@@ -23,12 +27,15 @@ class SmartFix:
             bool: True if fixes were applied, False otherwise
         """
         try:
-            logger.info(f"Analyzing file for issues: {file_path}")
-            content = file_path.read_text()
+            logger.info("Analyzing file for issues: %s", file_path)
+            source = self.reader.open(file_path)
+            if source is None:
+                return False
             
             # Try to parse the file
             try:
-                ast.parse(content)
+                with source:
+                    source.parse()
             except SyntaxError as e:
                 return self._fix_syntax_errors(file_path, e)
             
@@ -56,5 +63,5 @@ class SmartFix:
     def _fix_syntax_errors(self, file_path: Path, error: SyntaxError) -> bool:
         """Fix basic syntax errors"""
         # TODO: Implement basic syntax error fixing
-        logger.warning(f"Syntax error in {file_path}: {str(error)}")
+        logger.warning("Syntax error in %s: %s", file_path, error)
         return False 
\ No newline at end of file
@@ -1,44 +1,52 @@
 #!/usr/bin/env python3
 
+import os
 import sys
 import argparse
 import logging
 from pathlib import Path
-from typing import Optional, NoReturn
+from typing import Dict, List, Optional, NoReturn
 import platform
 from config.secure_config import SecureConfig
+from utils.profiling import Profiler, span, timed
+from utils.log_pipeline import LOG_LEVELS, configure_logging
 from datetime import datetime
 
 # Check Python version
 if sys.version_info < (3, 7):
     sys.exit("Python 3.7 or higher is required to run KARX")
 
-# Setup logging with file output
-def setup_logging() -> None:
-    log_dir = Path("logs")
-    log_dir.mkdir(exist_ok=True)
-    
-    logging.basicConfig(
-        level=logging.INFO,
-        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-        handlers=[
-            logging.StreamHandler(),
-            logging.FileHandler(log_dir / "karx.log")
-        ]
-    )
+# Setup non-blocking logging with a rotating file output
+def setup_logging(level: str = "INFO", json_lines: bool = False,
+                  module_levels: Optional[Dict[str, str]] = None) -> None:
+    configure_logging(Path("logs"), level=level, json_lines=json_lines, module_levels=module_levels)
+
+def parse_module_levels(specs: List[str]) -> Dict[str, str]:
+    """Parse 'module=LEVEL' pairs from the command line"""
+    levels = {}
+    for spec in specs:
+        name, sep, level = spec.partition("=")
+        if not sep or not name or level.upper() not in LOG_LEVELS:
+            raise argparse.ArgumentTypeError(f"Invalid module log level: {spec}")
+        levels[name] = level.upper()
+    return levels
 
 logger = logging.getLogger(__name__)
 
 class SecureKarxController:
-    def __init__(self, token: str):
-        self.config = SecureConfig()
-        if not self.config.verify_access(token):
+    def __init__(self, token: Optional[str] = None, session: Optional[str] = None):
+        self.config = SecureConfig.shared()
+        if session is not None:
+            if not self.config.verify_session(session):
+                raise PermissionError("Invalid or expired session")
+        elif token is None or not self.config.verify_access(token):
             raise PermissionError("Invalid access token")
             
         self.output_path = self.config.get_output_path()
         if not self.output_path:
             raise ValueError("Output path not configured")
     
+    @span("command.generate")
     def generate_code(self, prompt: str) -> Optional[Path]:
         """Generate code from a prompt"""
         try:
@@ -47,8 +55,9 @@ class SecureKarxController:
             output_file = self.output_path / f"generated_{timestamp}.py"
             
             # Write the generated code
-            output_file.write_text(f"# Generated from prompt at {timestamp}\n\n{prompt}\n\n# TODO: Implement generated code")
-            logger.info(f"Code generated at: {output_file}")
+            with timed("io.write"):
+                output_file.write_text(f"# Generated from prompt at {timestamp}\n\n{prompt}\n\n# TODO: Implement generated code")
+            logger.info("Code generated at: %s", output_file)
             
             return output_file
             
@@ -56,6 +65,7 @@ class SecureKarxController:
             logger.error(f"Error generating code: {str(e)}")
             return None
     
+    @span("command.explain")
     def explain_code(self, content: str) -> bool:
         """Explain the provided code content"""
         try:
@@ -64,9 +74,10 @@ class SecureKarxController:
             output_file = self.output_path / f"explanation_{timestamp}.txt"
             
             explanation = f"Code Explanation ({timestamp}):\n\n{content}\n\n# TODO: Implement explanation"
-            output_file.write_text(explanation)
+            with timed("io.write"):
+                output_file.write_text(explanation)
             
-            logger.info(f"Explanation written to: {output_file}")
+            logger.info("Explanation written to: %s", output_file)
             return True
             
         except Exception as e:
@@ -74,14 +85,19 @@ class SecureKarxController:
             return False
 
 def main() -> int:
-    setup_logging()
-    
-    # Log system information
-    logger.info(f"Python version: {platform.python_version()}")
-    logger.info(f"Operating system: {platform.system()} {platform.release()}")
-    
     parser = argparse.ArgumentParser(description='KARX - Secure AI Code Assistant')
-    parser.add_argument('--token', required=True, help='Access token for authentication')
+    env_token = os.environ.get('KARX_TOKEN')
+    parser.add_argument('--token', default=env_token, required=env_token is None,
+                        help='Access token for authentication (defaults to $KARX_TOKEN)')
+    parser.add_argument('--profile', action='store_true',
+                        help='Profile the command and write the report to the output directory')
+    parser.add_argument('--profile-mode', choices=Profiler.MODES, default='cprofile',
+                        help='Profiler to use with --profile (default: cprofile)')
+    parser.add_argument('--log-level', default='INFO', type=str.upper,
+                        choices=LOG_LEVELS, help='Root log level')
+    parser.add_argument('--log-json', action='store_true', help='Write the log file as JSON lines')
+    parser.add_argument('--log-module', action='append', default=[], metavar='MODULE=LEVEL',
+                        help='Log level for one module, e.g. core.linker=DEBUG (repeatable)')
     
     subparsers = parser.add_subparsers(dest='command', help='Commands')
     
@@ -95,12 +111,40 @@ def main() -> int:
     
     args = parser.parse_args()
     
+    try:
+        module_levels = parse_module_levels(args.log_module)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    setup_logging(args.log_level, args.log_json, module_levels)
+    
+    # Log system information
+    logger.info("Python version: %s", platform.python_version())
+    logger.info("Operating system: %s %s", platform.system(), platform.release())
+    
     if not args.command:
         parser.print_help()
         return 1
     
+    if not args.profile:
+        return run_command(args)
+    
+    profiler = Profiler(mode=args.profile_mode, label=args.command)
+    controller_holder: List[SecureKarxController] = []
+    with profiler:
+        exit_code = run_command(args, controller_holder)
+    
+    # Fall back to the log directory when authentication never got that far
+    report_dir = controller_holder[0].output_path if controller_holder else Path("logs")
+    profiler.write_report(report_dir)
+    return exit_code
+
+def run_command(args: argparse.Namespace, controller_holder: Optional[List["SecureKarxController"]] = None) -> int:
+    """Run the parsed CLI command and return its exit code"""
     try:
-        controller = SecureKarxController(args.token)
+        with timed("auth"):
+            controller = SecureKarxController(args.token)
+        if controller_holder is not None:
+            controller_holder.append(controller)
         
         if args.command == 'generate':
             result = controller.generate_code(args.prompt)
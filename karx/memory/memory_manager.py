@@ -1,81 +1,92 @@
 from pathlib import Path
-import json
+import ast
 import logging
 import os
 import shutil
-from typing import Dict, List, Optional, Any
+import threading
+from typing import Dict, List, Optional, Any, Union
 from datetime import datetime
+from utils.helpers import synchronized
+from utils.persistence import load_data, save_data
+from utils.profiling import timed
+from utils.source_reader import SourceFile
+from memory.reference_index import ReferenceIndex, module_name_for
+from memory.records import CodeMap
 
 logger = logging.getLogger(__name__)
 
 class MemoryManager:
-    def __init__(self, memory_file: Path = Path("memory/code_map.json")):
+    def __init__(self, memory_file: Path = Path("memory/code_map.json"), project_root: Optional[Path] = None):
         self.memory_file = memory_file
         self.backup_file = memory_file.with_suffix('.json.bak')
+        self.project_root = (project_root or Path.cwd()).resolve()
         self.code_map = self._load_memory()
+        self.index_file = memory_file.with_name(f"{memory_file.stem}.refs.json")
+        self.references = self._load_references()
+        self._references_dirty = False
+        # Held by updates and queries so a watcher thread can apply changes while others query
+        self.lock = threading.RLock()
+    
+    def _load_references(self) -> ReferenceIndex:
+        """Load the cross-file reference index, starting empty if it is missing or corrupted"""
+        try:
+            if self.index_file.exists():
+                return ReferenceIndex.from_dict(load_data(self.index_file))
+        except Exception as e:
+            logger.warning(f"Reference index unreadable, starting a new one: {str(e)}")
+        return ReferenceIndex()
         
-    def _load_memory(self) -> Dict[str, Any]:
+    def _load_memory(self) -> CodeMap:
         """Load the code map from disk with backup handling"""
         try:
             # Try to load the main file
             if self.memory_file.exists():
                 try:
-                    return json.loads(self.memory_file.read_text(encoding='utf-8'))
-                except json.JSONDecodeError:
+                    return CodeMap.from_dict(load_data(self.memory_file))
+                except ValueError:
                     logger.warning("Main memory file corrupted, trying backup...")
             
             # Try to load the backup file
             if self.backup_file.exists():
                 try:
-                    data = json.loads(self.backup_file.read_text(encoding='utf-8'))
+                    data = load_data(self.backup_file, codec="json")
                     # Restore from backup
-                    self.memory_file.write_text(json.dumps(data, indent=2), encoding='utf-8')
+                    save_data(self.memory_file, data)
                     logger.info("Successfully restored from backup")
-                    return data
-                except json.JSONDecodeError:
+                    return CodeMap.from_dict(data)
+                except ValueError:
                     logger.error("Backup file also corrupted")
             
             # Create new memory map if neither file exists or both are corrupted
-            return {
-                "files": {},
-                "functions": {},
-                "classes": {},
-                "variables": {},
-                "last_updated": str(datetime.now())
-            }
+            return self._create_empty_memory()
         except Exception as e:
             logger.error(f"Error loading memory: {str(e)}")
             return self._create_empty_memory()
     
-    def _create_empty_memory(self) -> Dict[str, Any]:
+    def _create_empty_memory(self) -> CodeMap:
         """Create a new empty memory structure"""
-        return {
-            "files": {},
-            "functions": {},
-            "classes": {},
-            "variables": {},
-            "last_updated": str(datetime.now())
-        }
+        return CodeMap()
     
+    @synchronized
     def save_memory(self) -> bool:
         """Save the current code map to disk with backup"""
         try:
             # Create directory if it doesn't exist
             self.memory_file.parent.mkdir(parents=True, exist_ok=True)
             
-            # Create backup of existing file if it exists
+            # Keep the previous version as backup; the atomic write below gives
+            # the main file a new inode, so a hard link is enough
             if self.memory_file.exists():
-                shutil.copy2(self.memory_file, self.backup_file)
+                self._backup_memory_file()
             
             # Update timestamp
-            self.code_map["last_updated"] = str(datetime.now())
-            
-            # Write new content
-            temp_file = self.memory_file.with_suffix('.tmp')
-            temp_file.write_text(json.dumps(self.code_map, indent=2), encoding='utf-8')
+            self.code_map.last_updated = str(datetime.now())
             
-            # Atomic replace
-            temp_file.replace(self.memory_file)
+            # Write new content atomically; dicts only exist for serialization
+            save_data(self.memory_file, self.code_map.to_dict())
+            if self._references_dirty:
+                save_data(self.index_file, self.references.to_dict())
+                self._references_dirty = False
             
             return True
             
@@ -83,8 +94,31 @@ class MemoryManager:
             logger.error(f"Error saving memory: {str(e)}")
             return False
     
-    def add_file(self, file_path: Path, content: str) -> bool:
-        """Add or update a file in the code map"""
+    def _backup_memory_file(self) -> None:
+        """Point the backup file at the current memory file"""
+        try:
+            self.backup_file.unlink()
+        except FileNotFoundError:
+            pass
+        try:
+            os.link(self.memory_file, self.backup_file)
+        except OSError:
+            shutil.copy2(self.memory_file, self.backup_file)
+    
+    @synchronized
+    def add_file(self, file_path: Path, content: Union[str, SourceFile], save: bool = True) -> bool:
+        """
+        Add or update a file in the code map, saving unless save is False
+
+        Args:
+            file_path: File to index
+            content: Decoded text, or a SourceFile whose raw bytes are parsed
+                without decoding them first; the caller closes it
+            save: Write the code map to disk afterwards
+
+        Returns:
+            bool: True if the file was indexed (and saved)
+        """
         try:
             if not file_path.exists():
                 logger.error(f"File does not exist: {file_path}")
@@ -92,24 +126,69 @@ class MemoryManager:
                 
             rel_path = str(file_path.resolve())
             
-            # Extract file information
-            file_info = {
-                "last_modified": str(datetime.fromtimestamp(file_path.stat().st_mtime)),
-                "size": len(content),
-                "functions": self._extract_functions(content),
-                "classes": self._extract_classes(content),
-                "variables": self._extract_variables(content)
-            }
+            # Parse once for both the symbol extraction and the reference index
+            tree = self._parse_source(file_path, content)
             
-            # Update the code map
-            self.code_map["files"][rel_path] = file_info
+            # Extract file information into the code map
+            self.code_map.set_file(
+                rel_path,
+                file_path.stat().st_mtime,
+                content.size if isinstance(content, SourceFile) else len(content),
+                self._extract_functions(tree),
+                self._extract_classes(tree),
+                self._extract_variables(tree)
+            )
+            self._index_references(file_path, rel_path, tree)
             
-            return self.save_memory()
+            return self.save_memory() if save else True
             
         except Exception as e:
             logger.error(f"Error adding file to memory: {str(e)}")
             return False
     
+    @synchronized
+    def remove_file(self, file_path: Path, save: bool = True) -> bool:
+        """Remove a file from the code map, returning True if it was tracked"""
+        try:
+            rel_path = str(file_path.resolve())
+            removed = self.code_map.remove_file(rel_path)
+            if self.references.remove_file(rel_path):
+                self._references_dirty = True
+            if removed and save:
+                return self.save_memory()
+            return removed
+        except Exception as e:
+            logger.error(f"Error removing file from memory: {str(e)}")
+            return False
+    
+    def _parse_source(self, file_path: Path, content: Union[str, SourceFile]) -> Optional[ast.AST]:
+        """Parse a Python file, returning None for other files or syntax errors"""
+        if file_path.suffix != ".py":
+            return None
+        try:
+            if isinstance(content, SourceFile):
+                return content.parse()
+            with timed("ast.parse"):
+                return ast.parse(content)
+        except (SyntaxError, ValueError) as e:
+            logger.warning("Not indexing symbols of %s: %s", file_path, e)
+            return None
+    
+    def _index_references(self, file_path: Path, rel_path: str, tree: Optional[ast.AST]) -> None:
+        """Replace a Python file's call, import and attribute edges in the reference index"""
+        if tree is None:
+            if self.references.remove_file(rel_path):
+                self._references_dirty = True
+            return
+        self._references_dirty = True
+        module = module_name_for(Path(rel_path), self.project_root)
+        self.references.update_file(rel_path, module, tree)
+    
+    @synchronized
+    def blast_radius(self, file_path: Path, max_depth: int = 2) -> List[Path]:
+        """Files that import or call into the given file, up to max_depth hops away"""
+        return sorted(Path(p) for p in self.references.blast_radius(str(file_path.resolve()), max_depth))
+    
     def get_suggestions(self, context: str) -> List[str]:
         """Get code suggestions based on the current context"""
         try:
@@ -119,29 +198,63 @@ class MemoryManager:
             logger.error(f"Error getting suggestions: {str(e)}")
             return []
     
-    def _extract_functions(self, content: str) -> List[Dict[str, Any]]:
-        """Extract function definitions from code"""
+    def _extract_functions(self, tree: Optional[ast.AST]) -> List[Dict[str, Any]]:
+        """Extract function and method definitions from code"""
         try:
-            # TODO: Implement function extraction
-            return []
+            if tree is None:
+                return []
+            functions = [{"name": node.name, "line": node.lineno} for node in tree.body
+                         if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))]
+            for class_name, class_node in self._iter_classes(tree.body):
+                for item in class_node.body:
+                    if isinstance(item, (ast.FunctionDef, ast.AsyncFunctionDef)):
+                        functions.append({"name": f"{class_name}.{item.name}", "line": item.lineno})
+            return functions
         except Exception as e:
             logger.error(f"Error extracting functions: {str(e)}")
             return []
     
-    def _extract_classes(self, content: str) -> List[Dict[str, Any]]:
+    def _extract_classes(self, tree: Optional[ast.AST]) -> List[Dict[str, Any]]:
         """Extract class definitions from code"""
         try:
-            # TODO: Implement class extraction
-            return []
+            if tree is None:
+                return []
+            return [{"name": name, "line": node.lineno} for name, node in self._iter_classes(tree.body)]
         except Exception as e:
             logger.error(f"Error extracting classes: {str(e)}")
             return []
     
-    def _extract_variables(self, content: str) -> List[Dict[str, Any]]:
-        """Extract variable definitions from code"""
+    def _iter_classes(self, body: List[ast.stmt], prefix: str = ""):
+        """Yield (qualified name, node) for module-level classes and the classes nested in them"""
+        for node in body:
+            if isinstance(node, ast.ClassDef):
+                name = f"{prefix}{node.name}"
+                yield name, node
+                yield from self._iter_classes(node.body, f"{name}.")
+    
+    def _target_names(self, target: ast.expr) -> List[str]:
+        """Names bound by an assignment target; subscripts and attributes bind none"""
+        if isinstance(target, ast.Name):
+            return [target.id] if isinstance(target.ctx, ast.Store) else []
+        if isinstance(target, ast.Starred):
+            return self._target_names(target.value)
+        if isinstance(target, (ast.Tuple, ast.List)):
+            return [name for element in target.elts for name in self._target_names(element)]
+        return []
+    
+    def _extract_variables(self, tree: Optional[ast.AST]) -> List[Dict[str, Any]]:
+        """Extract module-level variable definitions from code"""
         try:
-            # TODO: Implement variable extraction
-            return []
+            if tree is None:
+                return []
+            variables = []
+            for node in tree.body:
+                targets = node.targets if isinstance(node, ast.Assign) else \
+                    [node.target] if isinstance(node, (ast.AnnAssign, ast.AugAssign)) else []
+                for target in targets:
+                    for name in self._target_names(target):
+                        variables.append({"name": name, "line": node.lineno})
+            return variables
         except Exception as e:
             logger.error(f"Error extracting variables: {str(e)}")
             return [] 
\ No newline at end of file
@@ -0,0 +1,172 @@
+import sys
+from array import array
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+SYMBOL_KINDS = ("functions", "classes", "variables")
+
+class SymbolColumns:
+    """Names and line numbers of one kind of symbol, stored column-wise"""
+
+    __slots__ = ("names", "lines")
+
+    def __init__(self, symbols: Iterable[Tuple[str, int]] = ()):
+        pairs = list(symbols)
+        self.names: Tuple[str, ...] = tuple(sys.intern(name) for name, _ in pairs)
+        self.lines = array("I", (line for _, line in pairs))
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def __iter__(self) -> Iterator[Tuple[str, int]]:
+        return zip(self.names, self.lines)
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        return [{"name": name, "line": line} for name, line in self]
+
+    @classmethod
+    def from_list(cls, items: Iterable[Any]) -> "SymbolColumns":
+        pairs = []
+        for item in items:
+            if isinstance(item, dict):
+                pairs.append((item.get("name", ""), item.get("line", 0)))
+            else:
+                pairs.append((str(item), 0))
+        return cls(pairs)
+
+_EMPTY_SYMBOLS = SymbolColumns()
+
+class FileRecord:
+    """Per-file entry of the code map"""
+
+    __slots__ = ("file_id", "mtime", "size", "functions", "classes", "variables")
+
+    def __init__(self, file_id: int, mtime: float, size: int,
+                 functions: SymbolColumns = _EMPTY_SYMBOLS,
+                 classes: SymbolColumns = _EMPTY_SYMBOLS,
+                 variables: SymbolColumns = _EMPTY_SYMBOLS):
+        self.file_id = file_id
+        self.mtime = mtime
+        self.size = size
+        self.functions = functions
+        self.classes = classes
+        self.variables = variables
+
+    def symbols(self, kind: str) -> SymbolColumns:
+        return getattr(self, kind)
+
+class CodeMap:
+    """
+    In-memory code map with interned paths and compact per-file records
+
+    Paths are interned once into an integer file-ID table and symbols are
+    stored column-wise, so no per-entry dicts or repeated keys are kept in
+    memory. The nested-dict JSON layout is only produced by to_dict() at
+    the serialization boundary.
+    """
+
+    def __init__(self):
+        self.paths: List[Optional[str]] = []
+        self.path_ids: Dict[str, int] = {}
+        self.files: Dict[int, FileRecord] = {}
+        self.last_updated = str(datetime.now())
+
+    def __len__(self) -> int:
+        return len(self.files)
+
+    def __contains__(self, path: str) -> bool:
+        file_id = self.path_ids.get(path)
+        return file_id is not None and file_id in self.files
+
+    def file_id(self, path: str) -> int:
+        """Get or assign the integer ID of a path"""
+        file_id = self.path_ids.get(path)
+        if file_id is None:
+            file_id = len(self.paths)
+            path = sys.intern(path)
+            self.paths.append(path)
+            self.path_ids[path] = file_id
+        return file_id
+
+    def set_file(self, path: str, mtime: float, size: int,
+                 functions: Iterable[Any] = (),
+                 classes: Iterable[Any] = (),
+                 variables: Iterable[Any] = ()) -> FileRecord:
+        """Add or replace the record of a file from {"name", "line"} symbol dicts"""
+        file_id = self.file_id(path)
+        record = FileRecord(file_id, mtime, size,
+                            *(SymbolColumns.from_list(symbols) or _EMPTY_SYMBOLS
+                              for symbols in (functions, classes, variables)))
+        self.files[file_id] = record
+        return record
+
+    def get_file(self, path: str) -> Optional[FileRecord]:
+        file_id = self.path_ids.get(path)
+        return self.files.get(file_id) if file_id is not None else None
+
+    def remove_file(self, path: str) -> bool:
+        """Remove a file's record, returning True if it existed"""
+        file_id = self.path_ids.pop(path, None)
+        if file_id is None:
+            return False
+        # IDs are never reused, the slot only drops its path reference
+        self.paths[file_id] = None
+        return self.files.pop(file_id, None) is not None
+
+    def items(self) -> Iterator[Tuple[str, FileRecord]]:
+        """Iterate over (path, record) pairs"""
+        for file_id, record in self.files.items():
+            yield self.paths[file_id], record
+
+    def symbol_names(self) -> Set[str]:
+        """All function, class and variable names in the code map"""
+        names: Set[str] = set()
+        for record in self.files.values():
+            for kind in SYMBOL_KINDS:
+                names.update(record.symbols(kind).names)
+        return names
+
+    def find_symbol(self, name: str) -> Iterator[Tuple[str, str, int]]:
+        """Yield (path, kind, line) for every definition of a name"""
+        for path, record in self.items():
+            for kind in SYMBOL_KINDS:
+                columns = record.symbols(kind)
+                for i, symbol in enumerate(columns.names):
+                    if symbol == name:
+                        yield path, kind, columns.lines[i]
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Produce the JSON layout of the code map"""
+        files = {}
+        for path, record in self.items():
+            files[path] = {
+                "last_modified": str(datetime.fromtimestamp(record.mtime)),
+                "size": record.size,
+                "functions": record.functions.to_list(),
+                "classes": record.classes.to_list(),
+                "variables": record.variables.to_list()
+            }
+        return {
+            "files": files,
+            "functions": {},
+            "classes": {},
+            "variables": {},
+            "last_updated": self.last_updated
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "CodeMap":
+        """Build a code map from its JSON layout"""
+        code_map = cls()
+        code_map.last_updated = data.get("last_updated", code_map.last_updated)
+        for path, info in data.get("files", {}).items():
+            try:
+                mtime = datetime.fromisoformat(info.get("last_modified", "")).timestamp()
+            except (TypeError, ValueError):
+                mtime = 0.0
+            file_id = code_map.file_id(path)
+            code_map.files[file_id] = FileRecord(
+                file_id, mtime, info.get("size", 0),
+                *(SymbolColumns.from_list(info.get(kind, [])) or _EMPTY_SYMBOLS for kind in SYMBOL_KINDS)
+            )
+        return code_map
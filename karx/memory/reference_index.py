@@ -0,0 +1,375 @@
+import ast
+import logging
+from array import array
+from collections import deque
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Edge kinds, stored as small integers in the flat per-file edge arrays
+CALL = 0
+IMPORT = 1
+ATTRIBUTE = 2
+EDGE_KINDS = {"call": CALL, "import": IMPORT, "attribute": ATTRIBUTE}
+
+def module_name_for(file_path: Path, project_root: Path) -> str:
+    """Get the dotted module name of a file relative to the project root"""
+    try:
+        parts = list(file_path.relative_to(project_root).with_suffix("").parts)
+    except ValueError:
+        parts = [file_path.stem]
+    if len(parts) > 1 and parts[-1] == "__init__":
+        parts.pop()
+    return ".".join(parts)
+
+class _EdgeCollector(ast.NodeVisitor):
+    """Collects call, import and attribute edges of one module"""
+
+    def __init__(self, module: str, is_package: bool):
+        self.module = module
+        self.package = module if is_package else module.rpartition(".")[0]
+        self.scopes: List[str] = [module]
+        self.classes: List[str] = []
+        self.aliases: Dict[str, str] = {}
+        self.local_defs: Set[str] = set()
+        self.definitions: List[str] = []
+        self.edges: List[Tuple[int, str, str]] = []
+
+    def collect(self, tree: ast.AST) -> List[Tuple[int, str, str]]:
+        """Walk a module AST, returning its (kind, source, target) edges"""
+        # Top-level definitions first, so calls before the definition still resolve
+        for node in getattr(tree, "body", []):
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                self.local_defs.add(node.name)
+        self.visit(tree)
+        return self.edges
+
+    def _resolve_module(self, module: Optional[str], level: int) -> str:
+        if not level:
+            return module or ""
+        base = self.package.split(".") if self.package else []
+        if level > 1:
+            base = base[:len(base) - (level - 1)]
+        return ".".join(base + ([module] if module else []))
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            self.edges.append((IMPORT, self.module, alias.name))
+            if alias.asname:
+                self.aliases[alias.asname] = alias.name
+            else:
+                top = alias.name.partition(".")[0]
+                self.aliases[top] = top
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        source = self._resolve_module(node.module, node.level)
+        if source:
+            self.edges.append((IMPORT, self.module, source))
+        for alias in node.names:
+            if alias.name != "*":
+                self.aliases[alias.asname or alias.name] = f"{source}.{alias.name}" if source else alias.name
+
+    def _visit_scope(self, node, name: str) -> None:
+        self.scopes.append(f"{self.scopes[-1]}.{name}")
+        self.definitions.append(self.scopes[-1])
+        self.generic_visit(node)
+        self.scopes.pop()
+
+    def visit_FunctionDef(self, node: ast.FunctionDef) -> None:
+        self._visit_scope(node, node.name)
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self.classes.append(f"{self.scopes[-1]}.{node.name}")
+        self._visit_scope(node, node.name)
+        self.classes.pop()
+
+    def _resolve_target(self, node: ast.AST) -> Optional[str]:
+        """Resolve a name or attribute chain rooted in an import or local definition"""
+        if isinstance(node, ast.Name):
+            if node.id in self.aliases:
+                return self.aliases[node.id]
+            if node.id in self.local_defs:
+                return f"{self.module}.{node.id}"
+            return None
+        if isinstance(node, ast.Attribute):
+            if isinstance(node.value, ast.Name) and node.value.id in ("self", "cls") and self.classes:
+                return f"{self.classes[-1]}.{node.attr}"
+            base = self._resolve_target(node.value)
+            return f"{base}.{node.attr}" if base else None
+        return None
+
+    def visit_Call(self, node: ast.Call) -> None:
+        target = self._resolve_target(node.func)
+        if target is None:
+            # Unresolved calls keep the bare name (builtins) or '.method'
+            if isinstance(node.func, ast.Name):
+                target = node.func.id
+            elif isinstance(node.func, ast.Attribute):
+                target = f".{node.func.attr}"
+        if target:
+            self.edges.append((CALL, self.scopes[-1], target))
+        self.generic_visit(node)
+
+    def visit_Attribute(self, node: ast.Attribute) -> None:
+        target = self._resolve_target(node)
+        self.edges.append((ATTRIBUTE, self.scopes[-1], target or f".{node.attr}"))
+        self.generic_visit(node)
+
+class ReferenceIndex:
+    """
+    Cross-file call, import and attribute reference index
+
+    Every symbol, module and unresolved name is interned to an integer ID.
+    IDs are reference counted by the edges and definitions using them and
+    are released for reuse once no file refers to them anymore.
+    Edges are kept in per-node adjacency maps in both directions, counting
+    how many files contribute each edge, so callers, callees and reverse
+    dependencies cost O(degree) and removing an edge costs O(1). Each file's
+    edges are also stored as a flat (kind, source, target) array so a
+    changed file can be replaced without touching the rest of the index.
+    """
+
+    def __init__(self):
+        self.names: List[Optional[str]] = []
+        self.ids: Dict[str, int] = {}
+        self._refcounts = array("I")
+        self._free_ids: List[int] = []
+        self.file_modules: Dict[str, str] = {}
+        self.module_files: Dict[str, str] = {}
+        self.file_edges: Dict[str, array] = {}
+        self.file_symbols: Dict[str, array] = {}
+        self._forward: Tuple[Dict[int, Dict[int, int]], ...] = ({}, {}, {})
+        self._reverse: Tuple[Dict[int, Dict[int, int]], ...] = ({}, {}, {})
+
+    def _intern(self, name: str) -> int:
+        """Get the ID of a name, taking one reference to it"""
+        node_id = self.ids.get(name)
+        if node_id is None:
+            if self._free_ids:
+                node_id = self._free_ids.pop()
+                self.names[node_id] = name
+            else:
+                node_id = len(self.names)
+                self.names.append(name)
+                self._refcounts.append(0)
+            self.ids[name] = node_id
+        self._refcounts[node_id] += 1
+        return node_id
+
+    def _release(self, node_id: int) -> None:
+        """Drop one reference to an ID, freeing it when it was the last one"""
+        self._refcounts[node_id] -= 1
+        if not self._refcounts[node_id]:
+            del self.ids[self.names[node_id]]
+            self.names[node_id] = None
+            self._free_ids.append(node_id)
+
+    def _link(self, kind: int, source: int, target: int) -> None:
+        for adjacency, key, value in ((self._forward[kind], source, target), (self._reverse[kind], target, source)):
+            neighbours = adjacency.setdefault(key, {})
+            neighbours[value] = neighbours.get(value, 0) + 1
+
+    def _unlink(self, kind: int, source: int, target: int) -> None:
+        for adjacency, key, value in ((self._forward[kind], source, target), (self._reverse[kind], target, source)):
+            neighbours = adjacency.get(key)
+            if neighbours is None or value not in neighbours:
+                continue
+            if neighbours[value] > 1:
+                neighbours[value] -= 1
+            else:
+                del neighbours[value]
+                if not neighbours:
+                    del adjacency[key]
+
+    def update_file(self, file_path: str, module: str, tree: ast.AST) -> None:
+        """Replace the edges contributed by a file with those of its new AST"""
+        self.remove_file(file_path)
+        collector = _EdgeCollector(module, Path(file_path).name == "__init__.py")
+        edges = collector.collect(tree)
+
+        flat = array("I")
+        for kind, source, target in dict.fromkeys(edges):
+            edge = (kind, self._intern(source), self._intern(target))
+            flat.extend(edge)
+            self._link(*edge)
+        self.file_edges[file_path] = flat
+        self.file_symbols[file_path] = array("I", (self._intern(name) for name in collector.definitions))
+        self.file_modules[file_path] = module
+        self.module_files[module] = file_path
+
+    def remove_file(self, file_path: str) -> bool:
+        """Drop all edges contributed by a file"""
+        flat = self.file_edges.pop(file_path, None)
+        if flat is None:
+            return False
+        for i in range(0, len(flat), 3):
+            self._unlink(flat[i], flat[i + 1], flat[i + 2])
+            self._release(flat[i + 1])
+            self._release(flat[i + 2])
+        for symbol_id in self.file_symbols.pop(file_path, ()):
+            self._release(symbol_id)
+        module = self.file_modules.pop(file_path, None)
+        if module is not None and self.module_files.get(module) == file_path:
+            del self.module_files[module]
+        return True
+
+    def _neighbours(self, adjacency: Dict[int, Dict[int, int]], name: str) -> List[str]:
+        node_id = self.ids.get(name)
+        if node_id is None or node_id not in adjacency:
+            return []
+        return [self.names[i] for i in adjacency[node_id]]
+
+    def callers(self, symbol: str) -> List[str]:
+        """Scopes that call the qualified symbol"""
+        return self._neighbours(self._reverse[CALL], symbol)
+
+    def callees(self, scope: str) -> List[str]:
+        """Symbols called from a qualified scope"""
+        return self._neighbours(self._forward[CALL], scope)
+
+    def dependencies(self, module: str) -> List[str]:
+        """Modules imported by a module"""
+        return self._neighbours(self._forward[IMPORT], module)
+
+    def dependents(self, module: str) -> List[str]:
+        """Modules that import a module"""
+        return self._neighbours(self._reverse[IMPORT], module)
+
+    def references(self, target: str) -> List[str]:
+        """Scopes that access an attribute, qualified or as '.name'"""
+        return self._neighbours(self._reverse[ATTRIBUTE], target)
+
+    def transitive(self, name: str, kind: str = "import", reverse: bool = True, max_depth: int = 3) -> Dict[str, int]:
+        """
+        Breadth-first closure over one edge kind, bounded by depth
+
+        Args:
+            name: Starting node
+            kind: 'call', 'import' or 'attribute'
+            reverse: Follow edges backwards (dependents/callers) instead of forwards
+            max_depth: Maximum number of hops
+
+        Returns:
+            Dict of reached node names to their distance
+        """
+        adjacency = (self._reverse if reverse else self._forward)[EDGE_KINDS[kind]]
+        start = self.ids.get(name)
+        if start is None:
+            return {}
+        distances = {start: 0}
+        queue = deque([start])
+        while queue:
+            node_id = queue.popleft()
+            depth = distances[node_id]
+            if depth >= max_depth:
+                continue
+            for neighbour in adjacency.get(node_id, ()):
+                if neighbour not in distances:
+                    distances[neighbour] = depth + 1
+                    queue.append(neighbour)
+        del distances[start]
+        return {self.names[node_id]: depth for node_id, depth in distances.items()}
+
+    def blast_radius(self, file_path: str, max_depth: int = 2) -> Set[str]:
+        """
+        Files that may be affected by a change to the given file
+
+        Follows reverse imports and reverse calls into the file's module,
+        up to max_depth hops, and maps the reached scopes back to files.
+        """
+        affected = {file_path}
+        frontier = [file_path]
+        for _ in range(max_depth):
+            next_frontier = []
+            for path in frontier:
+                exports = self.exports(path)
+                if exports is None:
+                    continue
+                for owner in self.dependent_files(*exports):
+                    if owner not in affected:
+                        affected.add(owner)
+                        next_frontier.append(owner)
+            if not next_frontier:
+                break
+            frontier = next_frontier
+        return affected
+
+    def imported_modules(self) -> Set[str]:
+        """All modules imported by the indexed files"""
+        return {self.names[target] for targets in self._forward[IMPORT].values() for target in targets}
+
+    def exports(self, file_path: str) -> Optional[Tuple[str, List[str]]]:
+        """Module name and qualified definitions of an indexed file"""
+        module = self.file_modules.get(file_path)
+        if module is None:
+            return None
+        return module, [self.names[i] for i in self.file_symbols.get(file_path, ())]
+
+    def dependent_files(self, module: str, symbols: List[str]) -> Set[str]:
+        """
+        Files in this index that import the module or call one of its symbols
+
+        The module may belong to another index, which lets callers combine
+        the indexes of several shards.
+        """
+        reached = set(self.dependents(module))
+        for symbol in symbols:
+            reached.update(self.callers(symbol))
+        return {owner for owner in map(self._file_of_scope, reached) if owner}
+
+    def _file_of_scope(self, scope: str) -> Optional[str]:
+        """Map a qualified scope back to the file of its longest matching module"""
+        name = scope
+        while name:
+            if name in self.module_files:
+                return self.module_files[name]
+            name = name.rpartition(".")[0]
+        return None
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Serialize the index with freed IDs compacted away; adjacency maps are rebuilt on load"""
+        dense = {}
+        for node_id, name in enumerate(self.names):
+            if name is not None:
+                dense[node_id] = len(dense)
+        files = {}
+        for path, flat in self.file_edges.items():
+            edges = flat.tolist()
+            edges[1::3] = [dense[i] for i in edges[1::3]]
+            edges[2::3] = [dense[i] for i in edges[2::3]]
+            files[path] = {"module": self.file_modules[path],
+                           "edges": edges,
+                           "symbols": [dense[i] for i in self.file_symbols.get(path, ())]}
+        return {"names": [name for name in self.names if name is not None], "files": files}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "ReferenceIndex":
+        """Rebuild an index from its serialized form"""
+        index = cls()
+        index.names = list(data.get("names", []))
+        index.ids = {name: i for i, name in enumerate(index.names)}
+        refcounts = [0] * len(index.names)
+        for path, info in data.get("files", {}).items():
+            flat = array("I", info["edges"])
+            symbols = array("I", info.get("symbols", []))
+            index.file_edges[path] = flat
+            index.file_symbols[path] = symbols
+            index.file_modules[path] = info["module"]
+            index.module_files[info["module"]] = path
+            for i in range(0, len(flat), 3):
+                index._link(flat[i], flat[i + 1], flat[i + 2])
+                refcounts[flat[i + 1]] += 1
+                refcounts[flat[i + 2]] += 1
+            for symbol_id in symbols:
+                refcounts[symbol_id] += 1
+        index._refcounts = array("I", refcounts)
+        # Names no file refers to, e.g. from an index written before IDs were released
+        for node_id, count in enumerate(refcounts):
+            if not count:
+                del index.ids[index.names[node_id]]
+                index.names[node_id] = None
+                index._free_ids.append(node_id)
+        return index
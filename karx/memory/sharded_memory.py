@@ -0,0 +1,373 @@
+import zlib
+import bisect
+import hashlib
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple, Union
+from utils.helpers import synchronized
+from utils.persistence import load_data, save_data
+from memory.memory_manager import MemoryManager
+from utils.source_reader import SourceFile
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MEMORY_DIR = Path("memory")
+DEFAULT_MAX_LOADED_SHARDS = 8
+MANIFEST_VERSION = 1
+SUMMARY_SUFFIX = ".summary.json"
+
+def shard_key(project_root: Path, package: Optional[str] = None) -> str:
+    """Get the stable shard key of a project root and optional top-level package"""
+    key = hashlib.sha1(str(project_root).encode('utf-8')).hexdigest()[:12]
+    return f"{key}-{package}" if package else key
+
+def name_hash(name: str) -> int:
+    """Stable 32-bit hash of a symbol name for the shard summaries"""
+    return zlib.crc32(name.encode('utf-8'))
+
+def _module_prefixes(module: str) -> List[str]:
+    """A dotted module name and all of its parent packages"""
+    parts = module.split(".")
+    return [".".join(parts[:i]) for i in range(len(parts), 0, -1)]
+
+class ShardedMemory:
+    """
+    Code memory split into one shard per project, or per top-level package
+
+    Each shard is a MemoryManager with its own code map and reference index
+    under <memory_dir>/shards/. Next to each shard a small summary file keeps
+    the sorted 32-bit hashes of its symbol names and the modules it imports.
+    Only the manifest and these summaries are read up front; shards are
+    loaded on first use and at most max_loaded_shards stay in memory, least
+    recently used first out. Unsaved changes are written before a shard is
+    evicted. Symbol lookups and blast radius queries use the summaries to
+    load only the shards that can match. Public methods hold lock, so
+    updates from a watcher thread do not race with queries.
+    """
+
+    def __init__(self, memory_dir: Path = DEFAULT_MEMORY_DIR, max_loaded_shards: int = DEFAULT_MAX_LOADED_SHARDS):
+        self.memory_dir = memory_dir
+        self.manifest_file = memory_dir / "manifest.json"
+        self.max_loaded_shards = max(1, max_loaded_shards)
+        self.projects: Dict[str, Dict[str, Any]] = {}
+        self.shards: Dict[str, Dict[str, Any]] = {}
+        self._load_manifest()
+        # Sorted name hashes and imported modules of every summarized shard
+        self.shard_names: Dict[str, array] = {}
+        self.shard_imports: Dict[str, Set[str]] = {}
+        # Imported module -> keys of the shards importing it
+        self.importers: Dict[str, Set[str]] = {}
+        self._load_summaries()
+        self._loaded: "OrderedDict[str, MemoryManager]" = OrderedDict()
+        self._unsaved: Set[str] = set()
+        self._stale_summaries: Set[str] = set()
+        self._dirty_summaries: Set[str] = set()
+        self._manifest_dirty = False
+        self.lock = threading.RLock()
+
+    def _load_manifest(self) -> None:
+        """Load registered projects and shards, starting empty if the manifest is unreadable"""
+        try:
+            if self.manifest_file.exists():
+                data = load_data(self.manifest_file)
+                self.projects = data.get("projects", {})
+                self.shards = data.get("shards", {})
+        except Exception as e:
+            logger.error(f"Error loading shard manifest: {str(e)}")
+
+    def _summary_file(self, key: str) -> Path:
+        return (self.memory_dir / self.shards[key]["file"]).with_suffix(SUMMARY_SUFFIX)
+
+    def _load_summaries(self) -> None:
+        """Load the summary of every shard; shards without one are summarized when loaded"""
+        for key in self.shards:
+            try:
+                summary_file = self._summary_file(key)
+                if summary_file.exists():
+                    data = load_data(summary_file)
+                    self._set_summary(key, array("I", data.get("names", [])), set(data.get("imports", [])))
+            except Exception as e:
+                # Summaries are derived data, they are rebuilt as shards are loaded
+                logger.warning(f"Summary of shard {key} unreadable, rebuilding it on load: {str(e)}")
+
+    def _set_summary(self, key: str, names: array, imports: Set[str]) -> None:
+        old_imports = self.shard_imports.get(key, set())
+        for module in old_imports - imports:
+            keys = self.importers.get(module)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.importers[module]
+        for module in imports - old_imports:
+            self.importers.setdefault(module, set()).add(key)
+        self.shard_names[key] = names
+        self.shard_imports[key] = imports
+
+    def _may_define(self, key: str, name: str) -> bool:
+        """Check a shard's name hashes; false positives are possible, misses are not"""
+        names = self.shard_names[key]
+        target = name_hash(name)
+        i = bisect.bisect_left(names, target)
+        return i < len(names) and names[i] == target
+
+    @synchronized
+    def register_project(self, project_root: Path, split_packages: bool = False) -> bool:
+        """
+        Register a project so its files are routed to its own shards
+
+        Args:
+            project_root: Root directory of the project
+            split_packages: Give each top-level package of the project its own shard
+
+        Returns:
+            bool: True if the project was registered or updated
+        """
+        try:
+            root = str(project_root.resolve())
+            entry = {"split_packages": split_packages}
+            if self.projects.get(root) != entry:
+                self.projects[root] = entry
+                self._manifest_dirty = True
+            return self.save() if self._manifest_dirty else True
+        except Exception as e:
+            logger.error(f"Error registering project: {str(e)}")
+            return False
+
+    def _route(self, file_path: Path) -> Optional[Tuple[str, str, Optional[str]]]:
+        """Find the (shard key, project root, package) of a file by its deepest registered root"""
+        path = file_path.resolve()
+        for parent in path.parents:
+            project = self.projects.get(str(parent))
+            if project is None:
+                continue
+            package = None
+            if project.get("split_packages"):
+                parts = path.relative_to(parent).parts
+                # Top-level modules of the project stay in the root shard
+                package = parts[0] if len(parts) > 1 else None
+            return shard_key(parent, package), str(parent), package
+        return None
+
+    @synchronized
+    def shard_for(self, file_path: Path, create: bool = False) -> Optional[MemoryManager]:
+        """
+        Get the loaded shard a file belongs to
+
+        Args:
+            file_path: File inside a registered project
+            create: Add a new shard to the manifest if the file's shard does not exist yet
+
+        Returns:
+            The shard, or None if the file is outside every registered project
+        """
+        found = self._find_shard(file_path, create)
+        return found[1] if found else None
+
+    def _find_shard(self, file_path: Path, create: bool) -> Optional[Tuple[str, MemoryManager]]:
+        route = self._route(file_path)
+        if route is None:
+            logger.warning("No registered project contains %s", file_path)
+            return None
+        key, root, package = route
+        if key not in self.shards:
+            if not create:
+                return None
+            self.shards[key] = {"root": root, "package": package, "file": f"shards/{key}.json"}
+            self._manifest_dirty = True
+        return key, self._load_shard(key)
+
+    def _load_shard(self, key: str) -> MemoryManager:
+        """Return a shard from the LRU, loading it and evicting the oldest as needed"""
+        shard = self._loaded.get(key)
+        if shard is not None:
+            self._loaded.move_to_end(key)
+            return shard
+
+        info = self.shards[key]
+        logger.debug("Loading shard %s (%s)", key, info.get("package") or info["root"])
+        shard = MemoryManager(self.memory_dir / info["file"], Path(info["root"]))
+        self._loaded[key] = shard
+        if key not in self.shard_names:
+            # Shards from before summaries existed, or with a lost summary
+            self._stale_summaries.add(key)
+        while len(self._loaded) > self.max_loaded_shards:
+            self._evict(next(iter(self._loaded)))
+        return shard
+
+    def _evict(self, key: str) -> None:
+        """Drop a shard from memory, saving it and its summary first if they changed"""
+        shard = self._loaded.pop(key)
+        self._refresh_summary(key, shard)
+        if key in self._unsaved:
+            self._unsaved.discard(key)
+            if not shard.save_memory():
+                logger.error(f"Unsaved changes of shard {key} were lost on eviction")
+        self._save_summary(key)
+        logger.debug("Evicted shard %s", key)
+
+    def _refresh_summary(self, key: str, shard: MemoryManager) -> None:
+        """Recompute the summary of a loaded shard whose files changed"""
+        if key in self._stale_summaries:
+            names = array("I", sorted({name_hash(name) for name in shard.code_map.symbol_names()}))
+            self._set_summary(key, names, shard.references.imported_modules())
+            self._stale_summaries.discard(key)
+            self._dirty_summaries.add(key)
+
+    def _refresh_loaded_summaries(self) -> None:
+        for key in list(self._stale_summaries):
+            if key in self._loaded:
+                self._refresh_summary(key, self._loaded[key])
+
+    def _save_summary(self, key: str) -> None:
+        """Write the summary of one shard if it changed"""
+        if key in self._dirty_summaries:
+            save_data(self._summary_file(key), {"names": self.shard_names[key].tolist(),
+                                                "imports": sorted(self.shard_imports[key])})
+            self._dirty_summaries.discard(key)
+
+    @property
+    @synchronized
+    def loaded_shards(self) -> List[str]:
+        """Keys of the shards currently in memory, least recently used first"""
+        return list(self._loaded)
+
+    @synchronized
+    def add_file(self, file_path: Path, content: Union[str, SourceFile], save: bool = True) -> bool:
+        """Add or update a file in its project's shard, saving unless save is False"""
+        found = self._find_shard(file_path, create=True)
+        if found is None:
+            return False
+        key, shard = found
+        if not shard.add_file(file_path, content, save=False):
+            return False
+        self._unsaved.add(key)
+        self._stale_summaries.add(key)
+        return self.save() if save else True
+
+    @synchronized
+    def remove_file(self, file_path: Path, save: bool = True) -> bool:
+        """Remove a file from its shard, returning True if it was tracked"""
+        found = self._find_shard(file_path, create=False)
+        if found is None:
+            return False
+        key, shard = found
+        if not shard.remove_file(file_path, save=False):
+            return False
+        self._unsaved.add(key)
+        self._stale_summaries.add(key)
+        return self.save() if save else True
+
+    @synchronized
+    def find_symbol(self, name: str) -> List[Dict[str, Any]]:
+        """
+        Find the definitions of a function, class or variable across all shards
+
+        Only shards whose name hashes contain the name, or that have no
+        summary yet, are loaded.
+
+        Args:
+            name: Symbol name, methods as 'Class.method'
+
+        Returns:
+            List of dicts with file, kind and line of each definition
+        """
+        try:
+            self._refresh_loaded_summaries()
+            candidates = [key for key in self.shards
+                          if key not in self.shard_names or self._may_define(key, name)]
+            results = []
+            for key in sorted(candidates):
+                shard = self._load_shard(key)
+                self._refresh_summary(key, shard)
+                for path, kind, line in shard.code_map.find_symbol(name):
+                    results.append({"file": path, "kind": kind, "line": line})
+            return results
+        except Exception as e:
+            logger.error(f"Error finding symbol: {str(e)}")
+            return []
+
+    def _importing_shards(self, root: str, modules: Iterable[str]) -> Set[str]:
+        """Shards of a project that import one of the modules or a package containing it"""
+        keys = set()
+        for module in modules:
+            for prefix in _module_prefixes(module):
+                keys.update(self.importers.get(prefix, ()))
+        # Shards without a summary cannot be ruled out
+        keys.update(key for key in self.shards if key not in self.shard_names)
+        return {key for key in keys if self.shards[key]["root"] == root}
+
+    @synchronized
+    def blast_radius(self, file_path: Path, max_depth: int = 2) -> List[Path]:
+        """
+        Files of the same project that import or call into the given file
+
+        Dependents in other package shards are found too. At each hop only
+        the shards whose summary shows an import of a reached module are
+        loaded, since calls into a module always go through an import.
+        """
+        start = str(file_path.resolve())
+        try:
+            route = self._route(file_path)
+            if route is None:
+                return [Path(start)]
+            root = route[1]
+            self._refresh_loaded_summaries()
+
+            affected = {start}
+            frontier = [start]
+            for _ in range(max_depth):
+                exports = []
+                for path in frontier:
+                    found = self._find_shard(Path(path), create=False)
+                    if found is not None:
+                        exported = found[1].references.exports(path)
+                        if exported is not None:
+                            exports.append(exported)
+                frontier = []
+                for key in sorted(self._importing_shards(root, (module for module, _ in exports))):
+                    shard = self._load_shard(key)
+                    self._refresh_summary(key, shard)
+                    for module, symbols in exports:
+                        for owner in shard.references.dependent_files(module, symbols):
+                            if owner not in affected:
+                                affected.add(owner)
+                                frontier.append(owner)
+                if not frontier:
+                    break
+            return sorted(Path(path) for path in affected)
+        except Exception as e:
+            logger.error(f"Error computing blast radius: {str(e)}")
+            return [Path(start)]
+
+    @synchronized
+    def save(self) -> bool:
+        """Save loaded shards with unsaved changes, the manifest and the changed shard summaries"""
+        try:
+            ok = True
+            for key in list(self._unsaved):
+                shard = self._loaded.get(key)
+                if shard is not None and shard.save_memory():
+                    self._unsaved.discard(key)
+                else:
+                    ok = False
+            self._refresh_loaded_summaries()
+
+            if self._manifest_dirty:
+                save_data(self.manifest_file, {
+                    "version": MANIFEST_VERSION,
+                    "projects": self.projects,
+                    "shards": self.shards
+                }, pretty=True)
+                self._manifest_dirty = False
+            for key in list(self._dirty_summaries):
+                self._save_summary(key)
+            return ok
+        except Exception as e:
+            logger.error(f"Error saving sharded memory: {str(e)}")
+            return False
+
+    # Lets ShardedMemory stand in for a MemoryManager, e.g. behind IndexUpdater
+    save_memory = save
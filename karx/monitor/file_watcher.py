@@ -0,0 +1,356 @@
+import os
+import sys
+import time
+import errno
+import select
+import struct
+import ctypes
+import ctypes.util
+import logging
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+from utils.helpers import PatternMatcher, build_exclude_matcher, walk_files
+from utils.source_reader import SourceReader
+
+logger = logging.getLogger(__name__)
+
+# Called with (changed, deleted) absolute paths after a burst of events settles
+ChangeCallback = Callable[[Set[Path], Set[Path]], None]
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+_WATCH_MASK = (IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+               IN_CREATE | IN_DELETE | IN_DELETE_SELF)
+_EVENT_HEADER = struct.Struct("iIII")
+
+class PollingBackend:
+    """Detects changes by comparing (mtime, size) snapshots of the tree"""
+
+    def __init__(self, root: Path, include: List[str], exclude: List[str], interval: float = 1.0):
+        self.root = root
+        self.include = include
+        self.exclude = exclude
+        self.interval = interval
+        self._snapshot = self._take_snapshot()
+
+    def _take_snapshot(self) -> Dict[str, Tuple[float, int]]:
+        return {record.path: (record.mtime, record.size)
+                for record in walk_files(self.root, include=self.include, exclude=self.exclude)}
+
+    def read_events(self, timeout: float) -> Optional[Dict[str, bool]]:
+        """Wait up to timeout and return {path: deleted} for changes since the last call"""
+        time.sleep(min(timeout, self.interval))
+        current = self._take_snapshot()
+        events = {path: False for path, info in current.items() if self._snapshot.get(path) != info}
+        events.update((path, True) for path in self._snapshot.keys() - current.keys())
+        self._snapshot = current
+        return events
+
+    def rescan(self) -> Dict[str, bool]:
+        """Report every file as changed and vanished files as deleted"""
+        current = self._take_snapshot()
+        events = {path: False for path in current}
+        events.update((path, True) for path in self._snapshot.keys() - current.keys())
+        self._snapshot = current
+        return events
+
+    def close(self) -> None:
+        self._snapshot = {}
+
+class InotifyBackend:
+    """Receives change events from the Linux kernel through inotify"""
+
+    def __init__(self, root: Path, include: List[str], exclude: List[str]):
+        self.root = root
+        self.include = PatternMatcher(include)
+        self.exclude = build_exclude_matcher(root, exclude)
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._watches: Dict[int, str] = {}
+        # Wanted files under the watched directories, so moved-out trees can be reported
+        self._files: Set[str] = set()
+        self._add_tree(str(root))
+
+    def _rel_path(self, path: str) -> str:
+        return os.path.relpath(path, self.root).replace(os.sep, "/")
+
+    def _add_watch(self, path: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), _WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err == errno.ENOSPC:
+                logger.warning("inotify watch limit reached, raise fs.inotify.max_user_watches")
+            else:
+                logger.warning(f"Cannot watch {path}: {os.strerror(err)}")
+            return
+        # A directory moved within the tree keeps its wd, only its path changes
+        self._watches[wd] = path
+
+    def _add_tree(self, top: str) -> List[str]:
+        """Watch a directory and its subdirectories, returning the wanted files found in them"""
+        files = []
+        for dirpath, dirnames, filenames in os.walk(top):
+            dirnames[:] = [d for d in dirnames
+                           if not self.exclude.matches(d, self._rel_path(os.path.join(dirpath, d)), is_dir=True)]
+            self._add_watch(dirpath)
+            files.extend(path for path in (os.path.join(dirpath, name) for name in filenames)
+                         if self._wanted(path))
+        self._files.update(files)
+        return files
+
+    def _remove_tree(self, top: str) -> List[str]:
+        """Stop watching a moved or deleted directory, returning the files known under it"""
+        prefix = os.path.join(top, "")
+        for wd, path in list(self._watches.items()):
+            if path == top or path.startswith(prefix):
+                self._libc.inotify_rm_watch(self._fd, wd)
+                del self._watches[wd]
+        files = [path for path in self._files if path.startswith(prefix)]
+        self._files.difference_update(files)
+        return files
+
+    def rescan(self) -> Dict[str, bool]:
+        """Re-watch the whole tree after lost events, reporting every file and the vanished ones"""
+        known = self._files
+        for wd in list(self._watches):
+            self._libc.inotify_rm_watch(self._fd, wd)
+        self._watches.clear()
+        self._files = set()
+        events = {path: False for path in self._add_tree(str(self.root))}
+        events.update((path, True) for path in known - self._files)
+        return events
+
+    def _wanted(self, path: str) -> bool:
+        name = os.path.basename(path)
+        rel_path = self._rel_path(path)
+        if self.exclude and self.exclude.matches(name, rel_path):
+            return False
+        return not self.include or self.include.matches(name, rel_path)
+
+    def read_events(self, timeout: float) -> Optional[Dict[str, bool]]:
+        """
+        Wait up to timeout and return {path: deleted} for the events received
+
+        Returns None if the kernel queue overflowed and events were lost.
+        """
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return {}
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return {}
+
+        events: Dict[str, bool] = {}
+        overflowed = False
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b"\0"))
+            offset += length
+
+            if mask & IN_Q_OVERFLOW:
+                overflowed = True
+                continue
+            if mask & IN_IGNORED:
+                self._watches.pop(wd, None)
+                continue
+            directory = self._watches.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, name)
+
+            if mask & IN_ISDIR:
+                # Moved-out or deleted directories are unwatched and their files reported deleted,
+                # new or moved-in directories are watched and their files reported
+                if mask & (IN_DELETE | IN_MOVED_FROM):
+                    events.update((file_path, True) for file_path in self._remove_tree(path))
+                elif mask & (IN_CREATE | IN_MOVED_TO) and self._wanted_dir(path):
+                    events.update((file_path, False) for file_path in self._add_tree(path))
+                continue
+            if self._wanted(path):
+                deleted = bool(mask & (IN_DELETE | IN_MOVED_FROM))
+                if deleted:
+                    self._files.discard(path)
+                else:
+                    self._files.add(path)
+                events[path] = deleted
+
+        return None if overflowed else events
+
+    def _wanted_dir(self, path: str) -> bool:
+        return not self.exclude.matches(os.path.basename(path), self._rel_path(path), is_dir=True)
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+        self._watches.clear()
+        self._files.clear()
+
+class FileWatcher:
+    """
+    Watches a project tree and reports coalesced bursts of file changes
+
+    Uses inotify on Linux and falls back to polling elsewhere. Events are
+    collected until no new event arrived for `debounce` seconds (or
+    `max_delay` passed), then the callback receives the changed and deleted
+    paths once, with repeated events on the same file merged.
+    """
+
+    def __init__(self,
+                 root: Path,
+                 callback: ChangeCallback,
+                 include: Optional[Iterable[str]] = ("*.py",),
+                 exclude: Optional[Iterable[str]] = None,
+                 backend: str = "auto",
+                 debounce: float = 0.2,
+                 max_delay: float = 2.0,
+                 poll_interval: float = 1.0):
+        self.root = root.resolve()
+        self.callback = callback
+        self.debounce = debounce
+        self.max_delay = max_delay
+        self.poll_interval = poll_interval
+        self.include = list(include or [])
+        self.exclude = list(exclude or [])
+        self.backend_name = backend
+        self.backend = None
+        self.is_running = False
+        self.thread = None
+
+    def _create_backend(self):
+        if self.backend_name in ("auto", "inotify") and sys.platform.startswith("linux"):
+            try:
+                return InotifyBackend(self.root, self.include, self.exclude)
+            except Exception as e:
+                if self.backend_name == "inotify":
+                    raise
+                logger.warning(f"inotify unavailable, falling back to polling: {str(e)}")
+        elif self.backend_name == "inotify":
+            raise OSError("inotify is only available on Linux")
+        return PollingBackend(self.root, self.include, self.exclude, self.poll_interval)
+
+    def start_watching(self):
+        """Start watching the tree in a background thread"""
+        if self.is_running:
+            logger.warning("File watcher is already running")
+            return
+
+        self.backend = self._create_backend()
+        self.is_running = True
+        self.thread = threading.Thread(target=self._watch, name="karx-file-watcher")
+        self.thread.daemon = True
+        self.thread.start()
+
+        logger.info(f"Started watching {self.root} ({type(self.backend).__name__})")
+
+    def stop_watching(self):
+        """Stop watching the tree"""
+        self.is_running = False
+        if self.thread:
+            self.thread.join()
+            self.thread = None
+        if self.backend:
+            self.backend.close()
+            self.backend = None
+        logger.info("Stopped watching files")
+
+    def _full_rescan(self) -> Dict[str, bool]:
+        """Report every watched file as changed, and vanished ones as deleted, after events were lost"""
+        logger.warning("File events were lost, rescanning the tree")
+        return self.backend.rescan()
+
+    def _watch(self):
+        """Background thread function collecting and flushing events"""
+        pending: Dict[str, bool] = {}
+        first_event = last_event = 0.0
+        while self.is_running:
+            try:
+                events = self.backend.read_events(self.debounce if pending else 0.5)
+                if events is None:
+                    events = self._full_rescan()
+                now = time.monotonic()
+                if events:
+                    if not pending:
+                        first_event = now
+                    pending.update(events)
+                    last_event = now
+                if pending and (now - last_event >= self.debounce or now - first_event >= self.max_delay):
+                    self._flush(pending)
+                    pending = {}
+            except Exception as e:
+                logger.error(f"Error watching files: {str(e)}")
+                time.sleep(self.poll_interval)
+        if pending:
+            self._flush(pending)
+
+    def _flush(self, pending: Dict[str, bool]) -> None:
+        """Deliver one coalesced batch of changes to the callback"""
+        changed, deleted = set(), set()
+        for path in pending:
+            # The final state on disk wins over the order of the events
+            (changed if os.path.exists(path) else deleted).add(Path(path))
+        if changed or deleted:
+            logger.info("Detected %d changed and %d deleted file(s)", len(changed), len(deleted))
+            self.callback(changed, deleted)
+
+class IndexUpdater:
+    """
+    Feeds file changes into the code map, module map and parse caches
+
+    Use an instance as the FileWatcher callback to keep the indexes current
+    without full rescans. Each batch is applied while holding the memory
+    manager's and linker's locks, so queries from other threads never see
+    a half-applied batch.
+    """
+
+    def __init__(self, root: Path, memory_manager, linker=None, caches: Iterable = (),
+                 reader: Optional[SourceReader] = None):
+        self.root = root.resolve()
+        self.memory_manager = memory_manager
+        self.linker = linker
+        self.caches = list(caches)
+        self.reader = reader or SourceReader()
+
+    def __call__(self, changed: Set[Path], deleted: Set[Path]) -> None:
+        with self.memory_manager.lock:
+            for path in deleted:
+                self.memory_manager.remove_file(path, save=False)
+            for path in changed:
+                # Parsed from the raw bytes, without decoding to str first
+                source = self.reader.open(path)
+                if source is None:
+                    continue
+                with source:
+                    self.memory_manager.add_file(path, source, save=False)
+            self.memory_manager.save_memory()
+        # Each skip was logged when it happened; drop the report so it cannot grow without bound
+        skipped = self.reader.clear_skipped()
+        if skipped:
+            logger.info("Skipped %d file(s) in this batch", len(skipped))
+
+        touched = changed | deleted
+        if self.linker is not None:
+            with self.linker.lock:
+                self.linker.update_module_map(self.root, changed, deleted)
+                self.linker.invalidate(touched)
+        for cache in self.caches:
+            cache.invalidate(touched)
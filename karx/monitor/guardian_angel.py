@@ -3,8 +3,9 @@ import logging
 import threading
 from pathlib import Path
 from typing import Dict, Optional, List
+from collections import deque
 from datetime import datetime
-import json
+from utils.persistence import iter_json_array, save_data
 
 logger = logging.getLogger(__name__)
 
@@ -29,8 +30,8 @@ class GuardianAngel:
         """Load resource history from file"""
         try:
             if self.history_file.exists():
-                data = json.loads(self.history_file.read_text(encoding='utf-8'))
-                return data.get('snapshots', [])
+                # Stream the snapshots so an oversized history never loads in full
+                return list(deque(iter_json_array(self.history_file, key='snapshots'), maxlen=100))
         except Exception as e:
             logger.error(f"Error loading resource history: {str(e)}")
         return []
@@ -38,13 +39,12 @@ class GuardianAngel:
     def _save_history(self) -> None:
         """Save resource history to file"""
         try:
-            self.history_file.parent.mkdir(parents=True, exist_ok=True)
             with self.lock:
                 data = {
                     'snapshots': self.snapshots[-100:],  # Keep last 100 snapshots
                     'last_updated': str(datetime.now())
                 }
-                self.history_file.write_text(json.dumps(data, indent=2), encoding='utf-8')
+            save_data(self.history_file, data)
         except Exception as e:
             logger.error(f"Error saving resource history: {str(e)}")
     
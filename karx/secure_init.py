@@ -14,7 +14,7 @@ def init_secure_karx():
     """Initialize KARX with secure settings"""
     try:
         # Create secure configuration
-        config = SecureConfig()
+        config = SecureConfig.shared()
         
         # Generate a secure access token
         access_token = secrets.token_urlsafe(32)
@@ -23,6 +23,7 @@ def init_secure_karx():
         print("\nKARX Secure Setup")
         print("================")
         
+        # Prompt outside the batch so the shared configuration is not locked while waiting for input
         while True:
             output_dir = input("\nEnter the absolute path where KARX should write files: ").strip()
             if not output_dir:
@@ -30,36 +31,32 @@ def init_secure_karx():
                 continue
                 
             path = Path(output_dir)
+            # Ensure path is absolute
+            if not path.is_absolute():
+                print("Please provide an absolute path")
+                continue
+            
+            # Output path, access token and permissions are written once, when the batch
+            # exits; raising inside it rolls all of them back
             try:
-                # Ensure path is absolute
-                if not path.is_absolute():
-                    print("Please provide an absolute path")
-                    continue
+                with config.batch_update():
+                    # Set and create output directory
+                    if not config.set_output_path(path):
+                        raise ValueError("Failed to set output directory")
                     
-                # Set and create output directory
-                if config.set_output_path(path):
-                    break
-                else:
-                    print("Failed to set output directory. Please try again.")
-            except Exception as e:
-                print(f"Error with path: {str(e)}")
-        
-        # Set access token
-        if not config.set_access_token(access_token):
-            print("Failed to set access token")
-            return False
-        
-        # Set minimal permissions
-        config.config["permissions"].update({
-            "can_read_files": True,
-            "can_write_files": True,
-            "can_execute_commands": False,
-            "allowed_directories": [str(path)]
-        })
-        
-        if not config.save_config():
-            print("Failed to save configuration")
-            return False
+                    # Set access token and minimal permissions
+                    if not config.set_access_token(access_token):
+                        raise ValueError("Failed to set access token")
+                    
+                    config.config["permissions"].update({
+                        "can_read_files": True,
+                        "can_write_files": True,
+                        "can_execute_commands": False,
+                        "allowed_directories": [str(path)]
+                    })
+                break
+            except (OSError, ValueError) as e:
+                print(f"{str(e)}. Please try again.")
         
         # Print success message and token
         print("\nKARX has been configured successfully!")
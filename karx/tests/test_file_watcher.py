@@ -0,0 +1,82 @@
+import sys
+import queue
+import threading
+from core.linker import Linker
+from memory.memory_manager import MemoryManager
+from memory.sharded_memory import ShardedMemory
+from monitor.file_watcher import FileWatcher, IndexUpdater
+
+def _next_batch(batches: "queue.Queue", timeout: float = 5.0):
+    changed, deleted = batches.get(timeout=timeout)
+    return {p.name for p in changed}, {p.name for p in deleted}
+
+def test_polling_watcher_reports_batches(tmp_path):
+    root = tmp_path.resolve()
+    (root / "keep.py").write_text("x = 1\n")
+    batches = queue.Queue()
+    watcher = FileWatcher(root, lambda changed, deleted: batches.put((changed, deleted)),
+                          backend="polling", debounce=0.1, poll_interval=0.05)
+    watcher.start_watching()
+    try:
+        (root / "new.py").write_text("y = 2\n")
+        (root / "notes.txt").write_text("ignored\n")
+        assert _next_batch(batches) == ({"new.py"}, set())
+
+        (root / "keep.py").write_text("x = 10\n")
+        (root / "new.py").unlink()
+        assert _next_batch(batches) == ({"keep.py"}, {"new.py"})
+    finally:
+        watcher.stop_watching()
+    assert batches.empty()
+
+def test_index_updater_applies_changes(tmp_path):
+    root = tmp_path.resolve()
+    (root / "a.py").write_text("def f():\n    pass\n")
+    (root / "b.py").write_text("from a import f\n\ndef g():\n    f()\n")
+    memory = MemoryManager(root / "memory" / "code_map.json", project_root=root)
+    linker = Linker()
+    updater = IndexUpdater(root, memory, linker)
+    (root / "blob.dat").write_bytes(b"\0")
+
+    updater({root / "a.py", root / "b.py", root / "blob.dat"}, set())
+    assert updater.reader.skipped == {}
+    assert memory.blast_radius(root / "a.py") == [root / "a.py", root / "b.py"]
+    assert set(linker.module_map) == {"a", "b"}
+    assert (root / "memory" / "code_map.json").exists()
+
+    (root / "b.py").unlink()
+    updater(set(), {root / "b.py"})
+    assert memory.blast_radius(root / "a.py") == [root / "a.py"]
+    assert memory.code_map.get_file(str(root / "b.py")) is None
+    assert set(linker.module_map) == {"a"}
+
+def test_queries_during_updates(tmp_path):
+    root = tmp_path.resolve()
+    paths = [root / f"m{i}.py" for i in range(100)]
+    for i, path in enumerate(paths):
+        path.write_text(f"from m0 import f0\n\ndef f{i}():\n    f0()\n")
+    memory = ShardedMemory(root / "memory")
+    memory.register_project(root)
+    updater = IndexUpdater(root, memory)
+    updater(set(paths), set())
+    results = []
+    done = threading.Event()
+
+    def query():
+        while not done.is_set():
+            results.append(len(memory.find_symbol("f0")))
+
+    # Switch threads often so an unlocked update would be caught mid-iteration
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    thread = threading.Thread(target=query)
+    thread.start()
+    try:
+        for _ in range(5):
+            updater(set(), set(paths[1:]))
+            updater(set(paths), set())
+    finally:
+        done.set()
+        thread.join()
+        sys.setswitchinterval(interval)
+    assert results and set(results) == {1}
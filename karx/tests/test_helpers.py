@@ -0,0 +1,48 @@
+from utils.helpers import PatternMatcher, walk_files
+
+def _touch(path):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text("")
+
+def test_gitignore_anchoring_and_directory_patterns(tmp_path):
+    (tmp_path / ".gitignore").write_text("/build/\n/top.py\nlogs/\n*.log\n")
+    for rel in ("build/x.py", "sub/build/y.py", "top.py", "sub/top.py",
+                "logs/l.py", "sub/logs", "a.log", "sub/keep.py"):
+        _touch(tmp_path / rel)
+    found = sorted(record.rel_path for record in walk_files(tmp_path, include=["*.py", "logs"]))
+    assert found == ["sub/build/y.py", "sub/keep.py", "sub/logs", "sub/top.py"]
+
+def test_trailing_slash_matches_directories_only():
+    matcher = PatternMatcher(["cache/"])
+    assert matcher.matches("cache", "a/cache", is_dir=True)
+    assert not matcher.matches("cache", "a/cache")
+
+def test_symlinked_files_are_yielded_but_symlinked_dirs_not_descended(tmp_path):
+    import os
+    _touch(tmp_path / "real.py")
+    _touch(tmp_path / "outside" / "o.py")
+    os.symlink(tmp_path / "real.py", tmp_path / "link.py")
+    root = tmp_path / "root"
+    root.mkdir()
+    os.symlink(tmp_path / "real.py", root / "link.py")
+    os.symlink(tmp_path / "outside", root / "dir_link")
+    assert [record.rel_path for record in walk_files(root)] == ["link.py"]
+    assert sorted(record.rel_path for record in walk_files(root, follow_symlinks=True)) == ["dir_link/o.py", "link.py"]
+
+def test_closing_threaded_walk_early_does_not_wait_for_queued_scans(tmp_path, monkeypatch):
+    import time
+    from utils import helpers
+    for i in range(200):
+        _touch(tmp_path / f"d{i}" / "f.py")
+    scan_directory = helpers._scan_directory
+
+    def slow_scan(*args):
+        time.sleep(0.02)
+        return scan_directory(*args)
+
+    monkeypatch.setattr(helpers, "_scan_directory", slow_scan)
+    walker = walk_files(tmp_path, workers=2)
+    next(walker)
+    started = time.perf_counter()
+    walker.close()
+    assert time.perf_counter() - started < 1.0
@@ -0,0 +1,66 @@
+import ast
+from memory.memory_manager import MemoryManager
+from memory.records import CodeMap
+from utils.source_reader import SourceReader
+
+SOURCE = """
+import os
+KEY = "k"
+os.environ[KEY] = 1
+d = {}
+d[k] = 2
+obj.attr = 3
+a, (b, *rest) = 1, (2, 3)
+total: int = 0
+total += 1
+
+def top():
+    class Local:
+        pass
+
+class Outer:
+    def method(self):
+        pass
+    class Inner:
+        async def deep(self):
+            pass
+"""
+
+def _names(symbols):
+    return [symbol["name"] for symbol in symbols]
+
+def test_extractors_only_report_definitions(tmp_path):
+    manager = MemoryManager(tmp_path / "code_map.json", tmp_path)
+    tree = ast.parse(SOURCE)
+    assert _names(manager._extract_variables(tree)) == ["KEY", "d", "a", "b", "rest", "total", "total"]
+    assert _names(manager._extract_classes(tree)) == ["Outer", "Outer.Inner"]
+    assert _names(manager._extract_functions(tree)) == ["top", "Outer.method", "Outer.Inner.deep"]
+
+def test_code_map_round_trip(tmp_path):
+    source = tmp_path / "mod.py"
+    source.write_text(SOURCE)
+    manager = MemoryManager(tmp_path / "code_map.json", tmp_path)
+    assert manager.add_file(source, SOURCE)
+
+    data = manager.code_map.to_dict()
+    restored = CodeMap.from_dict(data)
+    assert restored.to_dict()["files"] == data["files"]
+    record = restored.get_file(str(source))
+    assert list(record.classes) == [("Outer", 16), ("Outer.Inner", 19)]
+    assert sorted(restored.symbol_names()) == sorted(manager.code_map.symbol_names())
+
+    reloaded = MemoryManager(tmp_path / "code_map.json", tmp_path)
+    assert reloaded.code_map.to_dict()["files"] == data["files"]
+
+def test_add_file_parses_source_bytes(tmp_path):
+    source = tmp_path / "latin.py"
+    source.write_bytes(b"# -*- coding: latin-1 -*-\nNAME = '\xe9'\n\ndef caf\xe9():\n    pass\n")
+    from_text = MemoryManager(tmp_path / "text.json", tmp_path)
+    assert from_text.add_file(source, source.read_text(encoding="latin-1"), save=False)
+    from_bytes = MemoryManager(tmp_path / "bytes.json", tmp_path)
+    with SourceReader(mmap_threshold=1).open(source) as loaded:
+        assert from_bytes.add_file(source, loaded, save=False)
+    record = from_bytes.code_map.get_file(str(source))
+    assert list(record.functions) == [("caf\xe9", 4)]
+    assert list(record.variables) == list(from_text.code_map.get_file(str(source)).variables)
+    assert record.size == source.stat().st_size
@@ -0,0 +1,71 @@
+import os
+import json
+import stat
+import pytest
+from utils import persistence
+from utils.persistence import atomic_write_bytes, iter_json_array, load_data, save_data
+
+DOCUMENT = {
+    "version": 1,
+    "skipped": {"text": 'a ] } , " \\ [ {', "list": [1, [2, [3]], {"x": "]"}]},
+    "snapshots": [
+        {"id": 0, "note": "comma, bracket ] and brace }"},
+        'plain string with "quotes" and \\ backslash',
+        12345.5,
+        [1, 2, {"nested": ["]", "["]}],
+        None,
+        {"id": 5, "unicode": "caf\u00e9 \u2603"}
+    ],
+    "after": [1, 2, 3]
+}
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 3, 7, 16, 64, 4096])
+def test_iter_json_array_across_chunk_boundaries(tmp_path, chunk_size):
+    path = tmp_path / "history.json"
+    path.write_text(json.dumps(DOCUMENT, indent=2), encoding="utf-8")
+    assert list(iter_json_array(path, key="snapshots", chunk_size=chunk_size)) == DOCUMENT["snapshots"]
+    assert list(iter_json_array(path, key="missing", chunk_size=chunk_size)) == []
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 4096])
+def test_iter_json_array_top_level_and_empty(tmp_path, chunk_size):
+    path = tmp_path / "array.json"
+    path.write_text('[ "a" ,1,{"b":[]} ]', encoding="utf-8")
+    assert list(iter_json_array(path, chunk_size=chunk_size)) == ["a", 1, {"b": []}]
+    path.write_text("[]", encoding="utf-8")
+    assert list(iter_json_array(path, chunk_size=chunk_size)) == []
+
+def test_iter_json_array_rejects_truncated_input(tmp_path):
+    path = tmp_path / "broken.json"
+    path.write_text('{"snapshots": [1, {"a": ', encoding="utf-8")
+    with pytest.raises(ValueError):
+        list(iter_json_array(path, key="snapshots", chunk_size=4))
+
+def test_atomic_write_uses_umask_for_new_files(tmp_path, monkeypatch):
+    monkeypatch.setattr(persistence, "_UMASK", 0o022)
+    path = tmp_path / "state" / "code_map.json"
+    save_data(path, {"a": 1})
+    assert load_data(path) == {"a": 1}
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o644
+
+def test_atomic_write_keeps_existing_mode_and_applies_explicit_mode(tmp_path):
+    path = tmp_path / "config.json"
+    path.write_bytes(b"old")
+    os.chmod(path, 0o640)
+    atomic_write_bytes(path, b"new")
+    assert path.read_bytes() == b"new"
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o640
+    atomic_write_bytes(path, b"secret", mode=0o600)
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o600
+
+def test_failed_atomic_write_keeps_old_content_and_no_temp_file(tmp_path, monkeypatch):
+    path = tmp_path / "data.json"
+    path.write_bytes(b"old")
+
+    def failing_replace(src, dst):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(persistence.os, "replace", failing_replace)
+    with pytest.raises(OSError):
+        atomic_write_bytes(path, b"new")
+    assert path.read_bytes() == b"old"
+    assert [p.name for p in tmp_path.iterdir()] == ["data.json"]
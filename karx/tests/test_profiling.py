@@ -0,0 +1,16 @@
+from utils.profiling import Profiler, enable_spans, get_stage_breakdown, spans_enabled, timed
+
+def test_profiler_restores_span_flag():
+    previous = spans_enabled()
+    try:
+        for mode in Profiler.MODES:
+            for initial in (False, True):
+                enable_spans(initial)
+                with Profiler(mode):
+                    assert spans_enabled()
+                    with timed("stage"):
+                        pass
+                assert spans_enabled() == initial
+                assert "stage" in get_stage_breakdown()
+    finally:
+        enable_spans(previous)
@@ -0,0 +1,34 @@
+import ast
+from memory.reference_index import ReferenceIndex
+
+def test_reindexing_releases_stale_names():
+    index = ReferenceIndex()
+    index.update_file("/p/b.py", "b", ast.parse("import a\ndef g():\n    a.f()\n"))
+    for i in range(50):
+        index.update_file("/p/a.py", "a", ast.parse(f"def f():\n    helper{i}()\ndef extra{i}(): pass\n"))
+    live = {name for name in index.names if name is not None}
+    assert "helper0" not in live and "helper49" in live
+    assert len(index.names) < 20
+    assert index.callers("a.f") == ["b.g"]
+
+    restored = ReferenceIndex.from_dict(index.to_dict())
+    assert None not in restored.names
+    assert restored.callees("a.f") == ["helper49"]
+    assert restored.blast_radius("/p/a.py") == {"/p/a.py", "/p/b.py"}
+
+def test_removing_all_files_frees_every_name():
+    index = ReferenceIndex()
+    index.update_file("/p/a.py", "a", ast.parse("import os\ndef f():\n    os.getcwd()\n"))
+    index.remove_file("/p/a.py")
+    assert index.ids == {}
+
+def test_edges_shared_by_files_survive_removing_one():
+    index = ReferenceIndex()
+    tree = ast.parse("def f():\n    len([])\n")
+    # Two files can contribute the same edge, e.g. a module and its stale copy
+    index.update_file("/p/a.py", "m", tree)
+    index.update_file("/q/a.py", "m", tree)
+    index.remove_file("/p/a.py")
+    assert index.callers("len") == ["m.f"]
+    index.remove_file("/q/a.py")
+    assert index.callers("len") == []
@@ -0,0 +1,86 @@
+import os
+from pathlib import Path
+from config.secure_config import SecureConfig
+
+def _config(tmp_path: Path, allowed: Path) -> SecureConfig:
+    config = SecureConfig(tmp_path / "karx_secure.json")
+    config.config["permissions"]["allowed_directories"] = [str(allowed)]
+    return config
+
+def test_allows_paths_inside_allowed_directory(tmp_path):
+    allowed = tmp_path / "allowed"
+    (allowed / "sub").mkdir(parents=True)
+    config = _config(tmp_path, allowed)
+    assert config.is_path_allowed(allowed / "sub" / "file.py")
+    assert config.is_path_allowed(allowed / "sub" / ".." / "file.py")
+    assert not config.is_path_allowed(tmp_path / "other.py")
+
+def test_rejects_symlink_escape(tmp_path):
+    allowed = tmp_path / "allowed"
+    outside = tmp_path / "outside"
+    allowed.mkdir()
+    outside.mkdir()
+    os.symlink(outside, allowed / "link")
+    config = _config(tmp_path, allowed)
+    assert not config.is_path_allowed(allowed / "link" / "secret")
+    assert not config.is_path_allowed(allowed / "link")
+
+def test_rejects_parent_reference_through_symlink(tmp_path):
+    allowed = tmp_path / "allowed"
+    (tmp_path / "outside" / "deep").mkdir(parents=True)
+    allowed.mkdir()
+    # allowed/link/.. is outside/, not allowed/
+    os.symlink(tmp_path / "outside" / "deep", allowed / "link")
+    config = _config(tmp_path, allowed)
+    assert not config.is_path_allowed(Path(f"{allowed}/link/../secret"))
+    assert not config.is_path_allowed(Path(f"{allowed}/.."))
+
+def test_expired_sessions_are_pruned_on_issue(tmp_path):
+    import hashlib
+    import config.secure_config as secure_config
+    config = SecureConfig(tmp_path / "karx_secure.json")
+    config.config["access_token"] = hashlib.sha256(b"token").hexdigest()
+    for _ in range(secure_config.SESSION_PRUNE_THRESHOLD):
+        config.issue_session("token", ttl=-1)
+    handle = config.issue_session("token")
+    assert len(config._sessions) == 1
+    assert config.verify_session(handle)
+    assert config.get_auth_metrics()["active_sessions"] == 1
+
+def test_batch_update_writes_once(tmp_path, monkeypatch):
+    config = SecureConfig(tmp_path / "karx_secure.json")
+    writes = []
+    write_config = config._write_config
+    monkeypatch.setattr(config, "_write_config", lambda: (writes.append(1), write_config()))
+    with config.batch_update():
+        assert config.set_output_path(tmp_path / "out")
+        with config.batch_update():
+            assert config.set_access_token("token")
+        assert not writes
+    assert len(writes) == 1
+    assert SecureConfig(tmp_path / "karx_secure.json").verify_access("token")
+
+def test_batch_update_rolls_back_on_error(tmp_path):
+    config_file = tmp_path / "karx_secure.json"
+    config = SecureConfig(config_file)
+    try:
+        with config.batch_update():
+            config.set_output_path(tmp_path / "out")
+            config.set_access_token("token")
+            raise ValueError("abort")
+    except ValueError:
+        pass
+    assert config.config["output_path"] is None
+    assert config.config["access_token"] is None
+    assert not config_file.exists()
+
+def test_reload_if_changed_picks_up_external_writes(tmp_path):
+    config_file = tmp_path / "karx_secure.json"
+    config = SecureConfig(config_file)
+    assert config.set_access_token("old")
+    assert not config.reload_if_changed()
+    other = SecureConfig(config_file)
+    assert other.set_access_token("new")
+    assert config.reload_if_changed()
+    assert config.verify_access("new")
+    assert not config.verify_access("old")
@@ -0,0 +1,75 @@
+from memory.memory_manager import MemoryManager
+from memory.sharded_memory import ShardedMemory, shard_key
+
+FILES = {
+    "pkg/a.py": "def f():\n    pass\n",
+    "pkg/b.py": "from pkg.a import f\ndef use():\n    f()\n",
+    "other/c.py": "from pkg import b\ndef g():\n    b.use()\n",
+    "third/d.py": "import other.c\ndef h():\n    other.c.g()\n",
+}
+# Packages that never import pkg or other
+UNRELATED = [f"extra{i}" for i in range(10)]
+
+def _project(tmp_path):
+    root = tmp_path / "proj"
+    for rel, source in FILES.items():
+        (root / rel).parent.mkdir(parents=True, exist_ok=True)
+        (root / rel).write_text(source)
+    for package in UNRELATED:
+        (root / package).mkdir()
+        (root / package / "m.py").write_text(f"import os\ndef {package}_func():\n    os.getcwd()\n")
+    return root.resolve()
+
+def _indexed(tmp_path, max_loaded_shards=2):
+    root = _project(tmp_path)
+    memory = ShardedMemory(tmp_path / "mem", max_loaded_shards=max_loaded_shards)
+    assert memory.register_project(root, split_packages=True)
+    for path in sorted(root.rglob("*.py")):
+        assert memory.add_file(path, path.read_text(), save=False)
+    assert memory.save()
+    return root, memory
+
+def test_shards_are_loaded_lazily_and_evicted_lru(tmp_path):
+    root, memory = _indexed(tmp_path)
+    assert len(memory.shards) == 3 + len(UNRELATED)
+    assert len(memory.loaded_shards) == 2
+
+    reopened = ShardedMemory(tmp_path / "mem", max_loaded_shards=2)
+    assert reopened.loaded_shards == []
+    assert reopened.find_symbol("extra3_func") == [
+        {"file": str(root / "extra3" / "m.py"), "kind": "functions", "line": 2}]
+    assert reopened.loaded_shards == [shard_key(root, "extra3")]
+    assert reopened.find_symbol("missing") == []
+    assert reopened.loaded_shards == [shard_key(root, "extra3")]
+
+def test_evicted_changes_are_saved(tmp_path):
+    root, memory = _indexed(tmp_path, max_loaded_shards=1)
+    path = root / "pkg" / "a.py"
+    path.write_text("def f():\n    pass\ndef added():\n    pass\n")
+    memory.add_file(path, path.read_text(), save=False)
+    # Touching another shard evicts pkg with its unsaved change
+    memory.find_symbol("extra0_func")
+    reopened = ShardedMemory(tmp_path / "mem")
+    assert [hit["file"] for hit in reopened.find_symbol("added")] == [str(path)]
+
+def test_blast_radius_crosses_shards_and_skips_unrelated_ones(tmp_path):
+    root, memory = _indexed(tmp_path)
+    unsharded = MemoryManager(tmp_path / "flat" / "code_map.json", root)
+    for path in sorted(root.rglob("*.py")):
+        unsharded.add_file(path, path.read_text(), save=False)
+
+    reopened = ShardedMemory(tmp_path / "mem", max_loaded_shards=len(memory.shards))
+    for depth in (1, 2, 3):
+        target = root / "pkg" / "a.py"
+        assert reopened.blast_radius(target, depth) == unsharded.blast_radius(target, depth)
+    loaded = set(reopened.loaded_shards)
+    assert loaded == {shard_key(root, package) for package in ("pkg", "other", "third")}
+
+def test_only_changed_summaries_are_rewritten(tmp_path):
+    root, memory = _indexed(tmp_path)
+    summaries = {path: path.stat().st_ino for path in (tmp_path / "mem" / "shards").glob("*.summary.json")}
+    assert len(summaries) == len(memory.shards)
+    path = root / "extra1" / "m.py"
+    memory.add_file(path, path.read_text() + "def more():\n    pass\n")
+    changed = [p.name for p, inode in summaries.items() if p.stat().st_ino != inode]
+    assert changed == [f"{shard_key(root, 'extra1')}.summary.json"]
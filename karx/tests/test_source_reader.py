@@ -0,0 +1,16 @@
+from utils.source_reader import SourceReader
+
+def test_skip_report_keeps_latest_entries(tmp_path):
+    reader = SourceReader(max_skipped=2)
+    paths = []
+    for i in range(3):
+        path = tmp_path / f"bin{i}.py"
+        path.write_bytes(b"\0")
+        paths.append(path)
+        assert reader.open(path) is None
+    assert list(reader.skipped) == [str(paths[1]), str(paths[2])]
+
+    assert reader.open(paths[1]) is None
+    assert list(reader.skipped) == [str(paths[2]), str(paths[1])]
+    assert reader.clear_skipped() == {str(paths[2]): "binary file", str(paths[1]): "binary file"}
+    assert reader.skipped == {}
@@ -1,11 +1,21 @@
 import os
+import re
+import fnmatch
+import functools
 import logging
 from pathlib import Path
-from typing import List, Dict, Any, Optional
-import json
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Callable, Iterable, Iterator, List, Dict, Any, NamedTuple, Optional, Tuple
+from utils.persistence import load_data, save_data
 
 logger = logging.getLogger(__name__)
 
+# Directories that are never worth walking into
+DEFAULT_EXCLUDES = (
+    ".git", ".hg", ".svn", "node_modules", "__pycache__", ".venv", "venv",
+    ".tox", ".nox", ".mypy_cache", ".pytest_cache", ".ruff_cache", "*.egg-info"
+)
+
 def ensure_directory(path: Path) -> Path:
     """Ensure a directory exists and create it if it doesn't"""
     path.mkdir(parents=True, exist_ok=True)
@@ -15,17 +25,16 @@ def load_json_file(file_path: Path) -> Dict[str, Any]:
     """Load and parse a JSON file"""
     try:
         if file_path.exists():
-            return json.loads(file_path.read_text())
+            return load_data(file_path, codec="json")
         return {}
     except Exception as e:
         logger.error(f"Error loading JSON file {file_path}: {str(e)}")
         return {}
 
-def save_json_file(file_path: Path, data: Dict[str, Any]):
-    """Save data to a JSON file"""
+def save_json_file(file_path: Path, data: Dict[str, Any], pretty: bool = False):
+    """Save data to a JSON file atomically, compact unless pretty is set"""
     try:
-        file_path.parent.mkdir(parents=True, exist_ok=True)
-        file_path.write_text(json.dumps(data, indent=2))
+        save_data(file_path, data, codec="json", pretty=pretty)
     except Exception as e:
         logger.error(f"Error saving JSON file {file_path}: {str(e)}")
 
@@ -34,13 +43,182 @@ def get_file_type(file_path: Path) -> str:
     return file_path.suffix.lower()[1:] if file_path.suffix else ""
 
 def list_files(directory: Path, pattern: str = "*") -> List[Path]:
-    """List all files in a directory matching a pattern"""
+    """List all files in a directory matching a pattern (prefer walk_files for trees)"""
     try:
         return list(directory.glob(pattern))
     except Exception as e:
         logger.error(f"Error listing files in {directory}: {str(e)}")
         return []
 
+class FileRecord(NamedTuple):
+    """A file found by walk_files, with the stat info read while walking"""
+    path: str
+    rel_path: str
+    name: str
+    size: int
+    mtime: float
+
+    @property
+    def file_path(self) -> Path:
+        return Path(self.path)
+
+class PatternMatcher:
+    """
+    Compiled glob patterns, matched against names or relative paths
+
+    Follows the .gitignore rules for slashes: a pattern with a leading or
+    inner slash is anchored to the root and matched against the relative
+    path, other patterns match a name at any depth, and a trailing slash
+    matches directories only. Unlike git, '*' also matches across '/' in
+    anchored patterns and '**' has no special meaning.
+    """
+
+    def __init__(self, patterns: Iterable[str]):
+        # (name, path) regex sources for any entry and for directories only
+        compiled: Dict[bool, Tuple[List[str], List[str]]] = {False: ([], []), True: ([], [])}
+        for pattern in patterns:
+            dir_only = pattern.endswith("/")
+            pattern = pattern.rstrip("/")
+            anchored = "/" in pattern
+            pattern = pattern.lstrip("/")
+            if pattern:
+                compiled[dir_only][1 if anchored else 0].append(fnmatch.translate(pattern))
+        self._name, self._path = (self._compile(sources) for sources in compiled[False])
+        self._dir_name, self._dir_path = (self._compile(sources) for sources in compiled[True])
+
+    @staticmethod
+    def _compile(sources: List[str]) -> Optional[Callable]:
+        return re.compile("|".join(sources)).match if sources else None
+
+    def __bool__(self) -> bool:
+        return any((self._name, self._path, self._dir_name, self._dir_path))
+
+    def matches(self, name: str, rel_path: str, is_dir: bool = False) -> bool:
+        if (self._name and self._name(name)) or (self._path and self._path(rel_path)):
+            return True
+        return is_dir and bool((self._dir_name and self._dir_name(name)) or
+                               (self._dir_path and self._dir_path(rel_path)))
+
+def load_ignore_patterns(directory: Path) -> List[str]:
+    """
+    Read glob patterns from the .gitignore at the root of a directory
+    
+    Negated patterns are not supported and are skipped.
+    """
+    ignore_file = directory / ".gitignore"
+    try:
+        if not ignore_file.exists():
+            return []
+        patterns = []
+        for line in ignore_file.read_text(encoding='utf-8', errors='replace').splitlines():
+            line = line.strip()
+            if line and not line.startswith(("#", "!")):
+                patterns.append(line)
+        return patterns
+    except Exception as e:
+        logger.error(f"Error reading ignore file {ignore_file}: {str(e)}")
+        return []
+
+def build_exclude_matcher(directory: Path,
+                          exclude: Optional[Iterable[str]] = None,
+                          use_gitignore: bool = True,
+                          default_excludes: bool = True) -> PatternMatcher:
+    """Combine explicit, default and .gitignore exclude patterns into one matcher"""
+    patterns = list(exclude or [])
+    if default_excludes:
+        patterns.extend(DEFAULT_EXCLUDES)
+    if use_gitignore:
+        patterns.extend(load_ignore_patterns(directory))
+    return PatternMatcher(patterns)
+
+def _scan_directory(path: str, rel_path: str, depth: int, include: PatternMatcher, exclude: PatternMatcher,
+                    max_depth: Optional[int], follow_symlinks: bool
+                    ) -> Tuple[List[FileRecord], List[Tuple[str, str, int]]]:
+    """List one directory, returning matching files and subdirectories to descend into"""
+    files: List[FileRecord] = []
+    subdirs: List[Tuple[str, str, int]] = []
+    try:
+        with os.scandir(path) as entries:
+            for entry in entries:
+                name = entry.name
+                entry_rel = f"{rel_path}/{name}" if rel_path else name
+                try:
+                    is_dir = entry.is_dir(follow_symlinks=follow_symlinks)
+                    if exclude and exclude.matches(name, entry_rel, is_dir):
+                        continue
+                    if is_dir:
+                        if max_depth is None or depth < max_depth:
+                            subdirs.append((entry.path, entry_rel, depth + 1))
+                    # follow_symlinks only limits descending, symlinked files are always listed
+                    elif entry.is_file():
+                        if include and not include.matches(name, entry_rel):
+                            continue
+                        st = entry.stat()
+                        files.append(FileRecord(entry.path, entry_rel, name, st.st_size, st.st_mtime))
+                except OSError as e:
+                    logger.warning("Skipping %s: %s", entry.path, e)
+    except OSError as e:
+        logger.warning(f"Cannot list directory {path}: {str(e)}")
+    return files, subdirs
+
+def walk_files(directory: Path,
+               include: Optional[Iterable[str]] = None,
+               exclude: Optional[Iterable[str]] = None,
+               use_gitignore: bool = True,
+               default_excludes: bool = True,
+               max_depth: Optional[int] = None,
+               follow_symlinks: bool = False,
+               workers: int = 0) -> Iterator[FileRecord]:
+    """
+    Walk a directory tree lazily, pruning ignored directories before descending
+    
+    Args:
+        directory: Root directory to walk
+        include: Glob patterns files must match, e.g. ["*.py"]; all files if empty
+        exclude: Glob patterns for files and directories to skip
+        use_gitignore: Also skip patterns from the root .gitignore
+        default_excludes: Also skip DEFAULT_EXCLUDES (VCS, virtualenv and cache dirs)
+        max_depth: Maximum directory depth to descend, 0 lists only the root
+        follow_symlinks: Descend into symlinked directories; symlinked files are always yielded
+        workers: List directories on this many threads, useful on network filesystems
+        
+    Yields:
+        FileRecord for every matching file
+    
+    Patterns without a slash match file or directory names, patterns with a
+    leading or inner slash match paths relative to the root, and a trailing
+    slash limits a pattern to directories, as in .gitignore.
+    """
+    include_matcher = PatternMatcher(include or [])
+    exclude_matcher = build_exclude_matcher(directory, exclude, use_gitignore, default_excludes)
+
+    def scan(item: Tuple[str, str, int]) -> Tuple[List[FileRecord], List[Tuple[str, str, int]]]:
+        return _scan_directory(item[0], item[1], item[2], include_matcher, exclude_matcher,
+                               max_depth, follow_symlinks)
+
+    root = (os.fspath(directory), "", 0)
+
+    if workers <= 0:
+        stack = [root]
+        while stack:
+            files, subdirs = scan(stack.pop())
+            yield from files
+            stack.extend(reversed(subdirs))
+        return
+
+    pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="karx-walk")
+    try:
+        pending = {pool.submit(scan, root)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                files, subdirs = future.result()
+                pending.update(pool.submit(scan, subdir) for subdir in subdirs)
+                yield from files
+    finally:
+        # Closing the generator early must not wait for the queued scans
+        pool.shutdown(wait=False, cancel_futures=True)
+
 def get_relative_path(path: Path, relative_to: Optional[Path] = None) -> Path:
     """Get a path relative to another path or the current working directory"""
     try:
@@ -56,4 +234,12 @@ def sanitize_filename(filename: str) -> str:
     invalid_chars = '<>:"/\\|?*'
     for char in invalid_chars:
         filename = filename.replace(char, '_')
-    return filename 
\ No newline at end of file
+    return filename 
+
+def synchronized(method: Callable) -> Callable:
+    """Run a method while holding its instance's lock attribute"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self.lock:
+            return method(self, *args, **kwargs)
+    return wrapper
\ No newline at end of file
@@ -0,0 +1,103 @@
+import copy
+import json
+import queue
+import atexit
+import logging
+import logging.handlers
+from pathlib import Path
+from typing import Dict, Optional
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+LOG_LEVELS = ('DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL')
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+class JsonFormatter(logging.Formatter):
+    """Formats records as one JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "thread": record.threadName
+        }
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+        return json.dumps(entry, ensure_ascii=False)
+
+class _InProcessQueueHandler(logging.handlers.QueueHandler):
+    """
+    Queue handler for a listener in the same process
+
+    Only the message is merged on the calling thread; timestamps, formatting
+    and tracebacks are rendered by the listener thread.
+    """
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+def configure_logging(log_dir: Path = Path("logs"),
+                      level: str = "INFO",
+                      json_lines: bool = False,
+                      module_levels: Optional[Dict[str, str]] = None,
+                      max_bytes: int = 10 * 1024 * 1024,
+                      backup_count: int = 5,
+                      console: bool = True) -> logging.handlers.QueueListener:
+    """
+    Route all logging through a queue to a background writer thread
+
+    Args:
+        log_dir: Directory for the rotating karx.log file
+        level: Root log level
+        json_lines: Write the log file as JSON lines instead of plain text
+        module_levels: Log levels per logger name, e.g. {"core.linker": "DEBUG"}
+        max_bytes: Size at which the log file is rotated
+        backup_count: Number of rotated log files to keep
+        console: Also log to stderr
+
+    Returns:
+        The running queue listener
+    """
+    global _listener
+    stop_logging()
+
+    log_dir.mkdir(parents=True, exist_ok=True)
+    file_handler = logging.handlers.RotatingFileHandler(
+        log_dir / "karx.log", maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8'
+    )
+    file_handler.setFormatter(JsonFormatter() if json_lines else logging.Formatter(LOG_FORMAT))
+    handlers = [file_handler]
+    if console:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter(LOG_FORMAT))
+        handlers.append(stream_handler)
+
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+        handler.close()
+    root.addHandler(_InProcessQueueHandler(log_queue))
+    root.setLevel(level.upper())
+    for name, module_level in (module_levels or {}).items():
+        logging.getLogger(name).setLevel(module_level.upper())
+
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+def stop_logging() -> None:
+    """Flush queued records and stop the background writer"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for handler in _listener.handlers:
+            handler.close()
+        _listener = None
+
+atexit.register(stop_logging)
@@ -0,0 +1,248 @@
+import os
+import json
+import stat
+import logging
+import tempfile
+from pathlib import Path
+from typing import Any, Iterator, Optional
+from utils.profiling import timed
+
+logger = logging.getLogger(__name__)
+
+# Optional fast codecs, the stdlib json module is used when they are missing
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+def _read_umask() -> int:
+    # os.umask can only be read by setting it, done once at import time
+    umask = os.umask(0o022)
+    os.umask(umask)
+    return umask
+
+_UMASK = _read_umask()
+
+CODECS = ("json", "msgpack")
+MSGPACK_SUFFIXES = (".msgpack", ".mpk")
+
+def _resolve_codec(path: Path, codec: str) -> str:
+    """Pick the codec for a file, 'auto' chooses by file suffix"""
+    if codec == "auto":
+        return "msgpack" if path.suffix in MSGPACK_SUFFIXES else "json"
+    if codec not in CODECS:
+        raise ValueError(f"Unknown codec: {codec}")
+    return codec
+
+def dumps(data: Any, codec: str = "json", pretty: bool = False) -> bytes:
+    """
+    Serialize data to bytes
+
+    JSON is compact unless pretty is set and uses orjson when it is installed.
+    """
+    if codec == "msgpack":
+        if msgpack is None:
+            raise ImportError("msgpack is not installed")
+        return msgpack.packb(data, use_bin_type=True)
+    if orjson is not None:
+        try:
+            return orjson.dumps(data, option=orjson.OPT_INDENT_2 if pretty else 0)
+        except TypeError:
+            # Non-string keys or exotic types, let the stdlib handle or reject them
+            pass
+    if pretty:
+        return json.dumps(data, indent=2).encode('utf-8')
+    return json.dumps(data, separators=(",", ":")).encode('utf-8')
+
+def loads(raw: bytes, codec: str = "json") -> Any:
+    """Deserialize bytes, raising ValueError on malformed input"""
+    if codec == "msgpack":
+        if msgpack is None:
+            raise ImportError("msgpack is not installed")
+        try:
+            return msgpack.unpackb(raw, raw=False)
+        except Exception as e:
+            raise ValueError(f"Invalid msgpack data: {str(e)}") from e
+    if orjson is not None:
+        return orjson.loads(raw)
+    return json.loads(raw)
+
+def atomic_write_bytes(path: Path, data: bytes, mode: Optional[int] = None) -> None:
+    """
+    Write bytes to a file atomically
+
+    The data goes to a temporary file in the same directory which is fsynced
+    and renamed over the target, so readers see either the old or the new
+    content, never a partial write. The permissions in mode are applied
+    before the rename; without a mode an existing file keeps its
+    permissions and a new one gets the usual 0o666 minus the umask.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if mode is None:
+        try:
+            mode = stat.S_IMODE(os.stat(path).st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK
+    fd, temp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.", suffix=".tmp")
+    try:
+        with timed("io.write"):
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            # mkstemp always creates the file as 0o600
+            os.chmod(temp_name, mode)
+            os.replace(temp_name, path)
+            _fsync_directory(path.parent)
+    except BaseException:
+        try:
+            os.unlink(temp_name)
+        except OSError:
+            pass
+        raise
+
+def _fsync_directory(directory: Path) -> None:
+    """Persist a rename by syncing its directory, where the platform allows it"""
+    if os.name != "posix":
+        return
+    try:
+        dir_fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(dir_fd)
+    except OSError:
+        pass
+    finally:
+        os.close(dir_fd)
+
+def save_data(path: Path, data: Any, codec: str = "auto", pretty: bool = False, mode: Optional[int] = None) -> None:
+    """
+    Serialize data and write it atomically, raising on failure
+
+    Args:
+        path: File to write
+        data: Data to serialize
+        codec: 'json', 'msgpack' or 'auto' to pick by file suffix
+        pretty: Indent JSON output for human readers
+        mode: Optional file permissions, e.g. 0o600
+    """
+    codec = _resolve_codec(path, codec)
+    with timed(f"{codec}.dump"):
+        raw = dumps(data, codec, pretty)
+    atomic_write_bytes(path, raw, mode)
+
+def load_data(path: Path, codec: str = "auto") -> Any:
+    """
+    Read and deserialize a file
+
+    Raises:
+        FileNotFoundError: If the file does not exist
+        ValueError: If the content is malformed
+    """
+    codec = _resolve_codec(path, codec)
+    with timed("io.read"):
+        raw = path.read_bytes()
+    with timed(f"{codec}.load"):
+        return loads(raw, codec)
+
+# Characters that can never follow a complete JSON number
+_NUMBER_CHARS = frozenset("0123456789+-.eE")
+
+class _JsonStream:
+    """Incremental JSON value reader over a text file"""
+
+    def __init__(self, f, chunk_size: int):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self, grow: bool = False) -> bool:
+        # Growing geometrically keeps re-decoding a large value linear overall
+        size = max(self.chunk_size, len(self.buffer) - self.pos) if grow else self.chunk_size
+        chunk = self.f.read(size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character without consuming it"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\n\r":
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                raise ValueError("Unexpected end of JSON data")
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected '{char}' at offset {self.pos}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        """Decode the next complete value, reading more data as needed"""
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+                # A value ending at the buffer edge may continue in the next chunk, and a
+                # number cut inside its fraction or exponent ('12.', '1e') decodes early
+                cut_number = (not self.eof and end < len(self.buffer) and isinstance(value, (int, float))
+                              and self.buffer[end] in _NUMBER_CHARS)
+                if (end < len(self.buffer) or self.eof) and not cut_number:
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if self.eof:
+                    raise
+            self._fill(grow=True)
+
+def iter_json_array(path: Path, key: Optional[str] = None, chunk_size: int = 64 * 1024) -> Iterator[Any]:
+    """
+    Stream the elements of a JSON array without loading the whole file
+
+    Args:
+        path: JSON file containing an array, or an object when key is given
+        key: Top-level key of the array to stream; other values are skipped
+        chunk_size: Number of characters read at a time
+
+    Yields:
+        Each element of the array
+    """
+    with open(path, "r", encoding='utf-8') as f:
+        stream = _JsonStream(f, chunk_size)
+        if key is not None:
+            stream.expect("{")
+            while True:
+                if stream.peek() == "}":
+                    return
+                name = stream.value()
+                stream.expect(":")
+                if name == key:
+                    break
+                stream.value()
+                if stream.peek() == ",":
+                    stream.pos += 1
+
+        stream.expect("[")
+        if stream.peek() == "]":
+            return
+        while True:
+            yield stream.value()
+            if stream.peek() == ",":
+                stream.pos += 1
+                continue
+            stream.expect("]")
+            return
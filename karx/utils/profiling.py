@@ -0,0 +1,221 @@
+import os
+import sys
+import time
+import json
+import cProfile
+import logging
+import threading
+import functools
+from contextlib import nullcontext
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, Optional, TypeVar
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Spans are opt-in: they are off unless enabled explicitly or via the environment
+_spans_enabled = os.environ.get("KARX_PROFILE_SPANS", "").lower() in ("1", "true", "yes")
+_span_lock = threading.Lock()
+_span_totals: Dict[str, list] = {}
+_NULL_SPAN = nullcontext()
+
+def enable_spans(enabled: bool = True) -> None:
+    """Turn fine-grained timing spans on or off for this process"""
+    global _spans_enabled
+    _spans_enabled = enabled
+
+def spans_enabled() -> bool:
+    """Return True if timing spans are currently being recorded"""
+    return _spans_enabled
+
+def reset_spans() -> None:
+    """Discard all recorded span timings"""
+    with _span_lock:
+        _span_totals.clear()
+
+def _record_span(stage: str, elapsed: float) -> None:
+    with _span_lock:
+        totals = _span_totals.get(stage)
+        if totals is None:
+            _span_totals[stage] = [elapsed, 1]
+        else:
+            totals[0] += elapsed
+            totals[1] += 1
+
+class _Span:
+    __slots__ = ("stage", "start")
+
+    def __init__(self, stage: str):
+        self.stage = stage
+        self.start = 0.0
+
+    def __enter__(self) -> "_Span":
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        _record_span(self.stage, time.perf_counter() - self.start)
+        return False
+
+def timed(stage: str):
+    """
+    Context manager timing a block under the given stage name
+
+    Returns a shared no-op context when spans are disabled, so the cost on
+    hot paths is a single flag check.
+    """
+    return _Span(stage) if _spans_enabled else _NULL_SPAN
+
+def span(stage: str) -> Callable[[F], F]:
+    """Decorator timing every call of a function under the given stage name"""
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _spans_enabled:
+                return func(*args, **kwargs)
+            with _Span(stage):
+                return func(*args, **kwargs)
+        return wrapper  # type: ignore[return-value]
+    return decorator
+
+def get_stage_breakdown() -> Dict[str, Dict[str, float]]:
+    """Get total time, call count and mean time per recorded stage"""
+    with _span_lock:
+        items = [(stage, totals[0], totals[1]) for stage, totals in _span_totals.items()]
+    return {
+        stage: {
+            "total_seconds": total,
+            "calls": count,
+            "mean_seconds": total / count if count else 0.0
+        }
+        for stage, total, count in sorted(items, key=lambda item: item[1], reverse=True)
+    }
+
+class _StackSampler:
+    """Samples the stack of one thread at a fixed interval into collapsed form"""
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="karx-sampler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                frame = frame.f_back
+            self.stacks[";".join(reversed(names))] += 1
+
+class Profiler:
+    """
+    Wraps a run in cProfile or a sampling profiler and writes the results
+
+    cProfile mode writes a .pstats file, sample mode writes a collapsed-stack
+    file suitable for flame graph tools. Both write a per-stage JSON breakdown
+    of the timing spans recorded during the run.
+    """
+
+    MODES = ("cprofile", "sample")
+
+    def __init__(self, mode: str = "cprofile", label: str = "run", sample_interval: float = 0.005):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown profiler mode: {mode}")
+        self.mode = mode
+        self.label = label
+        self.sample_interval = sample_interval
+        self._profile: Optional[cProfile.Profile] = None
+        self._sampler: Optional[_StackSampler] = None
+        self._started = 0.0
+        self._spans_were_enabled = False
+        self.wall_seconds = 0.0
+
+    def start(self) -> None:
+        """Start profiling and recording spans"""
+        reset_spans()
+        self._spans_were_enabled = spans_enabled()
+        enable_spans(True)
+        self._started = time.perf_counter()
+        if self.mode == "cprofile":
+            self._profile = cProfile.Profile()
+            self._profile.enable()
+        else:
+            self._sampler = _StackSampler(threading.get_ident(), self.sample_interval)
+            self._sampler.start()
+
+    def stop(self) -> None:
+        """Stop profiling and put span recording back the way start() found it"""
+        if self._profile:
+            self._profile.disable()
+        if self._sampler:
+            self._sampler.stop()
+        self.wall_seconds = time.perf_counter() - self._started
+        enable_spans(self._spans_were_enabled)
+
+    def __enter__(self) -> "Profiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self.stop()
+        return False
+
+    def write_report(self, output_dir: Path) -> Optional[Path]:
+        """
+        Write profiler output and stage breakdown to the output directory
+
+        Args:
+            output_dir: Directory to write the report files to
+
+        Returns:
+            Path to the stage breakdown file, or None on failure
+        """
+        try:
+            output_dir.mkdir(parents=True, exist_ok=True)
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            base = output_dir / f"profile_{self.label}_{timestamp}"
+
+            if self._profile:
+                self._profile.dump_stats(str(base.with_suffix(".pstats")))
+            if self._sampler:
+                lines = [f"{stack} {count}" for stack, count in self._sampler.stacks.most_common()]
+                base.with_suffix(".collapsed").write_text("\n".join(lines) + "\n", encoding='utf-8')
+
+            stages = get_stage_breakdown()
+            report = {
+                "label": self.label,
+                "mode": self.mode,
+                "wall_seconds": self.wall_seconds,
+                "stages": stages
+            }
+            stages_file = base.with_name(base.name + "_stages.json")
+            stages_file.write_text(json.dumps(report, indent=2), encoding='utf-8')
+
+            logger.info(f"Profile for '{self.label}' took {self.wall_seconds:.3f}s")
+            for stage, info in stages.items():
+                logger.info(f"  {stage}: {info['total_seconds']:.4f}s over {info['calls']} call(s)")
+            logger.info(f"Profile written to: {stages_file}")
+            return stages_file
+
+        except Exception as e:
+            logger.error(f"Error writing profile report: {str(e)}")
+            return None
@@ -0,0 +1,162 @@
+import io
+import os
+import ast
+import mmap
+import logging
+import tokenize
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Union
+from utils.profiling import timed
+
+logger = logging.getLogger(__name__)
+
+# Files larger than this are skipped
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+# Files at least this large are memory-mapped instead of read
+DEFAULT_MMAP_THRESHOLD = 256 * 1024
+# Leading bytes checked for NUL bytes to detect binary files
+BINARY_SNIFF_BYTES = 8192
+# Most recent skips kept in SourceReader.skipped
+DEFAULT_MAX_SKIPPED = 1000
+
+class SourceFile:
+    """
+    Raw bytes of a source file with its PEP 263 encoding
+
+    Large files are backed by a read-only memory map, which ast.parse reads
+    directly. The decoded text is only produced when it is asked for. Close
+    the file (or use it as a context manager) to release the map.
+    """
+
+    __slots__ = ("path", "data", "encoding", "_text")
+
+    def __init__(self, path: Path, data: Union[bytes, mmap.mmap], encoding: str):
+        self.path = path
+        self.data = data
+        self.encoding = encoding
+        self._text: Optional[str] = None
+
+    @property
+    def size(self) -> int:
+        return len(self.data)
+
+    @property
+    def text(self) -> str:
+        """Source decoded with its declared encoding, a BOM is stripped"""
+        if self._text is None:
+            self._text = str(self.data, self.encoding)
+        return self._text
+
+    def parse(self) -> ast.AST:
+        """Parse the raw bytes, letting the compiler honor the coding cookie"""
+        with timed("ast.parse"):
+            return ast.parse(self.data, filename=str(self.path))
+
+    def encode(self, text: str) -> bytes:
+        """Encode text for writing back with the file's own encoding"""
+        return text.encode(self.encoding)
+
+    def close(self) -> None:
+        if isinstance(self.data, mmap.mmap):
+            self.data.close()
+            self.data = b""
+
+    def __enter__(self) -> "SourceFile":
+        return self
+
+    def __exit__(self, *exc_info) -> bool:
+        self.close()
+        return False
+
+class SourceReader:
+    """
+    Loads source files for the agents with size, binary and encoding checks
+
+    Skipped files are recorded in `skipped` with the reason, instead of
+    raising in the middle of a bulk scan. Only the latest max_skipped
+    entries are kept, so long-running readers stay bounded.
+    """
+
+    def __init__(self,
+                 max_bytes: int = DEFAULT_MAX_BYTES,
+                 mmap_threshold: int = DEFAULT_MMAP_THRESHOLD,
+                 skip_binary: bool = True,
+                 max_skipped: int = DEFAULT_MAX_SKIPPED):
+        self.max_bytes = max_bytes
+        self.mmap_threshold = mmap_threshold
+        self.skip_binary = skip_binary
+        self.max_skipped = max_skipped
+        self.skipped: Dict[str, str] = {}
+        self._lock = threading.Lock()
+
+    def _skip(self, path: Path, reason: str) -> None:
+        with self._lock:
+            # Re-inserting moves a path to the end, so the oldest skip is dropped first
+            self.skipped.pop(str(path), None)
+            self.skipped[str(path)] = reason
+            if len(self.skipped) > self.max_skipped:
+                del self.skipped[next(iter(self.skipped))]
+        logger.info("Skipping %s: %s", path, reason)
+
+    def open(self, path: Path) -> Optional[SourceFile]:
+        """
+        Load a source file
+
+        Args:
+            path: File to load
+
+        Returns:
+            The loaded SourceFile, or None if the file was skipped
+        """
+        try:
+            with timed("io.read"):
+                with open(path, "rb") as f:
+                    size = os.fstat(f.fileno()).st_size
+                    if size > self.max_bytes:
+                        self._skip(path, f"larger than {self.max_bytes} bytes ({size})")
+                        return None
+                    if size and size >= self.mmap_threshold:
+                        data: Union[bytes, mmap.mmap] = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                    else:
+                        data = f.read()
+        except OSError as e:
+            self._skip(path, f"unreadable ({e.strerror or e})")
+            return None
+
+        if self.skip_binary and data.find(b"\0", 0, BINARY_SNIFF_BYTES) != -1:
+            self._close(data)
+            self._skip(path, "binary file")
+            return None
+
+        try:
+            # Only the first two lines are read to find a BOM or coding cookie
+            encoding, _ = tokenize.detect_encoding(io.BytesIO(data[:BINARY_SNIFF_BYTES]).readline)
+        except SyntaxError as e:
+            self._close(data)
+            self._skip(path, f"invalid encoding declaration ({e})")
+            return None
+
+        return SourceFile(path, data, encoding)
+
+    def read_text(self, path: Path) -> Optional[str]:
+        """Load and decode a file, returning None if it was skipped or cannot be decoded"""
+        source = self.open(path)
+        if source is None:
+            return None
+        with source:
+            try:
+                return source.text
+            except UnicodeDecodeError as e:
+                self._skip(path, f"not valid {source.encoding} ({e.reason})")
+                return None
+
+    def _close(self, data: Union[bytes, mmap.mmap]) -> None:
+        if isinstance(data, mmap.mmap):
+            data.close()
+
+    def clear_skipped(self) -> Dict[str, str]:
+        """Return and reset the skip report"""
+        with self._lock:
+            skipped, self.skipped = self.skipped, {}
+        return skipped